@@ -55,6 +55,21 @@ export interface TransactionStats {
   transaction_types: Record<string, number>;
 }
 
+export interface SyncChange {
+  idempotency_key: string;
+  op: 'create' | 'update' | 'delete';
+  id?: number;
+  data?: Partial<BackendTransaction>;
+}
+
+export interface SyncResponse {
+  token: string;
+  full_resync: boolean;
+  changed: BackendTransaction[];
+  deleted: number[];
+  results?: { idempotency_key: string; status: number; id: number | null; errors?: unknown }[];
+}
+
 class ApiService {
   private baseURL: string;
   private token: string | null;
@@ -258,6 +273,19 @@ class ApiService {
     }
   }
 
+  /**
+   * Delta sync: push queued offline changes and pull only what changed since the last token
+   */
+  async syncTransactions(since: string | null, changes: SyncChange[] = []): Promise<SyncResponse> {
+    const response = await fetch(`${this.baseURL}/transactions/sync/`, {
+      method: 'POST',
+      headers: this.getHeaders(true),
+      body: JSON.stringify({ since, changes }),
+    });
+
+    return this.handleResponse<SyncResponse>(response);
+  }
+
   /**
    * Get transaction statistics
    */
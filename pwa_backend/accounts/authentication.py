@@ -0,0 +1,117 @@
+"""
+JWT authentication backed by a short-lived in-process cache of user rows.
+
+Access tokens issued by ``issue_access_token`` also carry the user's
+username, email and names for clients to display, but the server never
+trusts them: ``request.user`` is the user row, looked up by id and cached
+in-process for ``JWT_USER_CACHE_TTL`` seconds, so most requests still need
+no authentication query. Saving or deleting a user drops the cached row in
+the process that made the change; other processes notice a deactivation or
+profile edit within the TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# User fields embedded in access tokens, in addition to the user id claim
+USER_CLAIMS = ('username', 'email', 'first_name', 'last_name')
+
+
+def issue_access_token(user):
+    """Return an access token for ``user`` carrying the USER_CLAIMS"""
+    access = RefreshToken.for_user(user).access_token
+    for claim in USER_CLAIMS:
+        access[claim] = getattr(user, claim)
+    return str(access)
+
+
+class UserCache:
+    """
+    Short-lived in-process cache of full user rows keyed by id, holding at
+    most ``JWT_USER_CACHE_MAX_ENTRIES`` rows and evicting the least recently
+    used one beyond that
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def cached(self, user_id):
+        """The cached row for ``user_id`` if it has not expired, else None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return copy.copy(entry[1])
+
+    def store(self, user):
+        ttl = getattr(settings, 'JWT_USER_CACHE_TTL', 30)
+        if ttl > 0 and user is not None:
+            max_entries = getattr(settings, 'JWT_USER_CACHE_MAX_ENTRIES', 10000)
+            with self._lock:
+                self._entries[user.pk] = (time.monotonic() + ttl, copy.copy(user))
+                self._entries.move_to_end(user.pk)
+                while len(self._entries) > max_entries:
+                    self._entries.popitem(last=False)
+        return user
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id):
+        user = self.cached(user_id)
+        if user is None:
+            user = self.store(User.objects.filter(pk=user_id).first())
+        return user
+
+    async def aget(self, user_id):
+        user = self.cached(user_id)
+        if user is None:
+            user = self.store(await User.objects.filter(pk=user_id).afirst())
+        return user
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def token_user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+
+
+def check_user(user):
+    """Reject missing and deactivated users, as JWTAuthentication does"""
+    if user is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user through ``user_cache``"""
+
+    def get_user(self, validated_token):
+        return check_user(user_cache.get(token_user_id(validated_token)))
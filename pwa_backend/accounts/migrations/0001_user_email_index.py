@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations, models
+
+EMAIL_INDEX = models.Index(fields=['email'], name='auth_user_email_idx')
+
+
+def add_email_index(apps, schema_editor):
+    # LoginView looks users up by email, which auth_user does not index
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    schema_editor.add_index(User, EMAIL_INDEX)
+
+
+def remove_email_index(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    schema_editor.remove_index(User, EMAIL_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        # Run after auth's own migrations: SQLite rebuilds auth_user on
+        # AlterField and would drop an index created earlier
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_email_index, remove_email_index),
+    ]
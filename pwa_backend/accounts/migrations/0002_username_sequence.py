@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_user_email_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsernameSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(max_length=150, unique=True)),
+                ('last', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
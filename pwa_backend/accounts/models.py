@@ -1,3 +1,65 @@
-from django.db import models
+import re
 
-# Create your models here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Cast, Substr
+
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+# Longest suffix reserved when truncating a base ("_" plus up to 9 digits)
+SUFFIX_RESERVE = 10
+
+
+class UsernameSequenceManager(models.Manager):
+
+    def allocate(self, base):
+        """
+        Reserve the next free username for ``base``: ``base`` itself the
+        first time, then ``base_1``, ``base_2``, ...
+
+        Runs a fixed number of queries however many users share the base.
+        The sequence row is incremented with a single UPDATE, which holds a
+        row lock until the surrounding transaction commits, so concurrent
+        registrations never receive the same suffix.
+        """
+        base = base[:USERNAME_MAX_LENGTH - SUFFIX_RESERVE]
+        with transaction.atomic(using=self.db):
+            if self.filter(base=base).update(last=F('last') + 1):
+                last = self.filter(base=base).values_list('last', flat=True).get()
+                return f'{base}_{last}'
+
+            last = self._next_existing_suffix(base)
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(base=base, last=last)
+            except IntegrityError:
+                # Another registration created the sequence first
+                return self.allocate(base)
+        return base if last == 0 else f'{base}_{last}'
+
+    def _next_existing_suffix(self, base):
+        """
+        Seed a new sequence past usernames allocated before sequences existed
+        (``base`` and ``base_<n>``), in one aggregate query.
+        """
+        suffix = Cast(Substr('username', len(base) + 2), IntegerField())
+        taken = User.objects.using(self.db).filter(
+            Q(username=base) | Q(username__regex=rf'^{re.escape(base)}_[0-9]+$')
+        ).aggregate(
+            count=Count('pk'),
+            last=Max(Case(When(username=base, then=Value(0)), default=suffix)),
+        )
+        if not taken['count']:
+            return 0
+        return taken['last'] + 1
+
+
+class UsernameSequence(models.Model):
+    """Last username suffix handed out for each base (the email local part)"""
+    base = models.CharField(max_length=USERNAME_MAX_LENGTH, unique=True)
+    last = models.PositiveIntegerField(default=0)
+
+    objects = UsernameSequenceManager()
+
+    def __str__(self):
+        return f"{self.base} ({self.last})"
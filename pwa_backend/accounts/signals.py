@@ -0,0 +1,11 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_cached_user(sender, instance, **kwargs):
+    user_cache.discard(instance.pk)
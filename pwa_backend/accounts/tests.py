@@ -1,3 +1,113 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from transactions.serializers import RegisterUserSerializer
+
+from .authentication import issue_access_token, user_cache
+from .models import UsernameSequence
+
+
+class UsernameSequenceTests(TestCase):
+
+    def register(self, email):
+        serializer = RegisterUserSerializer(data={
+            'name': 'Signup', 'email': email, 'password': 'password123', 'confirm_password': 'password123',
+            'account_number': '000000', 'ifsc_code': 'TEST0000',
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        return serializer.save()
+
+    def test_allocates_base_then_suffixes(self):
+        names = [UsernameSequence.objects.allocate('john') for _ in range(4)]
+        self.assertEqual(names, ['john', 'john_1', 'john_2', 'john_3'])
+
+    def test_seeds_past_existing_usernames(self):
+        User.objects.create(username='jane')
+        User.objects.create(username='jane_7')
+        User.objects.create(username='jane_smith')
+        self.assertEqual(UsernameSequence.objects.allocate('jane'), 'jane_8')
+        self.assertEqual(UsernameSequence.objects.allocate('jane'), 'jane_9')
+
+    def test_truncates_long_bases(self):
+        base = 'x' * 200
+        first = UsernameSequence.objects.allocate(base)
+        second = UsernameSequence.objects.allocate(base)
+        self.assertLessEqual(len(second), 150)
+        self.assertEqual(second, f'{first}_1')
+
+    def test_registration_queries_do_not_grow_with_collisions(self):
+        def queries_for(email):
+            with CaptureQueriesContext(connection) as captured:
+                self.register(email)
+            return len(captured)
+
+        self.register('sam@example.com')
+        early = queries_for('sam@example.org')
+        for i in range(20):
+            self.register(f'sam@example{i}.net')
+        self.assertEqual(queries_for('sam@example.io'), early)
+        self.assertEqual(User.objects.filter(username__startswith='sam').count(), 23)
+
+    def test_skips_usernames_taken_outside_the_sequence(self):
+        self.register('ann@example.com')
+        User.objects.create(username='ann_1')
+        self.assertEqual(self.register('ann@example.org').username, 'ann_2')
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class JWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user('claims', 'claims@example.com', 'password123')
+        self.client = Client(HTTP_AUTHORIZATION=f'Bearer {issue_access_token(self.user)}')
+
+    def test_deactivated_user_is_refused(self):
+        self.assertEqual(self.client.get('/api/accounts/verify-token/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/accounts/verify-token/').status_code, 401)
+
+    def test_profile_edits_are_not_served_from_the_token(self):
+        self.user.email = 'changed@example.com'
+        self.user.save()
+        response = self.client.get('/api/user/profile/')
+        self.assertEqual(response.data['email'], 'changed@example.com')
+
+    def test_user_row_is_cached(self):
+        self.client.get('/api/accounts/verify-token/')
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get('/api/accounts/verify-token/').status_code, 200)
+        self.assertEqual(len(captured), 0)
+
+    def test_cache_is_bounded(self):
+        users = [User(pk=pk, username=f'u{pk}') for pk in range(1, 6)]
+        with self.settings(JWT_USER_CACHE_MAX_ENTRIES=3):
+            for user in users[:3]:
+                user_cache.store(user)
+            self.assertIsNotNone(user_cache.cached(1))
+            user_cache.store(users[3])
+            user_cache.store(users[4])
+        # The least recently used rows are evicted first
+        self.assertEqual(len(user_cache), 3)
+        self.assertIsNone(user_cache.cached(2))
+        self.assertIsNotNone(user_cache.cached(1))
+
+        with mock.patch('accounts.authentication.time.monotonic', return_value=time.monotonic() + 3600):
+            self.assertIsNone(user_cache.cached(1))
+        self.assertEqual(len(user_cache), 2)
+
+
+class TokenLoginTests(TestCase):
+
+    def test_documented_token_login_flow(self):
+        User.objects.create_user('tokenuser', 'tokenuser@example.com', 'password123')
+        response = Client().post('/api/auth/login/', {'username': 'tokenuser', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        client = Client(HTTP_AUTHORIZATION=f'Token {response.data["token"]}')
+        self.assertEqual(client.get('/api/user/profile/').status_code, 200)
@@ -4,7 +4,7 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import issue_access_token
 from .serializers import RegisterSerializer, LoginSerializer
 
 
@@ -16,8 +16,7 @@ class RegisterView(APIView):
         if serializer.is_valid():
             user = serializer.save()
             # Generate JWT token for the newly registered user
-            refresh = RefreshToken.for_user(user)
-            access_token = str(refresh.access_token)
+            access_token = issue_access_token(user)
             
             return Response({
                 "message": "User registered successfully",
@@ -48,8 +47,7 @@ class LoginView(APIView):
             user_auth = authenticate(username=user.username, password=password)
             if user_auth is not None:
                 # Generate JWT token for the logged-in user
-                refresh = RefreshToken.for_user(user_auth)
-                access_token = str(refresh.access_token)
+                access_token = issue_access_token(user_auth)
                 
                 return Response({
                     "message": "Login successful",
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .middleware import record_timing
+
+
+class TimedAuthentication:
+    """
+    Runs the ``API_AUTHENTICATION_CLASSES`` chain and records the time spent
+    in each authenticator (see ``REQUEST_TIMING``).
+
+    Behaves exactly like listing the classes in
+    ``DEFAULT_AUTHENTICATION_CLASSES``: the first authenticator that returns
+    a user wins and authentication errors propagate unchanged.
+    """
+
+    def __init__(self):
+        self.authenticators = [import_string(path)() for path in settings.API_AUTHENTICATION_CLASSES]
+
+    def authenticate(self, request):
+        for authenticator in self.authenticators:
+            start = time.perf_counter()
+            try:
+                result = authenticator.authenticate(request)
+            finally:
+                record_timing(request._request, f'auth.{type(authenticator).__name__}', time.perf_counter() - start)
+            if result is not None:
+                return result
+        return None
+
+    def authenticate_header(self, request):
+        if self.authenticators:
+            return self.authenticators[0].authenticate_header(request)
+        return None
@@ -0,0 +1,72 @@
+"""
+Build ``DATABASES['default']`` from a ``DATABASE_URL``.
+
+Supported schemes:
+
+* ``sqlite:///relative/path.sqlite3`` (relative to ``BASE_DIR``),
+  ``sqlite:////absolute/path.sqlite3`` and ``sqlite://:memory:``. These use
+  the ``pwa_backend.sqlite`` backend, which applies ``PRAGMAS`` to every new
+  connection.
+* ``postgres://``/``postgresql://`` and ``mysql://``, with
+  ``user:password@host:port/name``. Query parameters become ``OPTIONS``,
+  for example ``?sslmode=require``.
+"""
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+ENGINES = {
+    'sqlite': 'pwa_backend.sqlite',
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'pgsql': 'django.db.backends.postgresql',
+    'mysql': 'django.db.backends.mysql',
+}
+
+
+def parse_database_url(url, base_dir):
+    """Return a Django database settings dict for ``url``"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ENGINES:
+        raise ValueError(f'Unsupported DATABASE_URL scheme {parts.scheme!r}')
+
+    if scheme == 'sqlite':
+        # sqlite:///db.sqlite3 -> "db.sqlite3", sqlite:////var/db.sqlite3 -> "/var/db.sqlite3"
+        path = unquote(parts.path[1:])
+        if parts.netloc == ':memory:' or path in ('', ':memory:'):
+            name = ':memory:'
+        else:
+            name = Path(base_dir) / path
+        return {'ENGINE': ENGINES[scheme], 'NAME': name}
+
+    return {
+        'ENGINE': ENGINES[scheme],
+        'NAME': unquote(parts.path.lstrip('/')),
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': parts.hostname or '',
+        'PORT': str(parts.port or ''),
+        'OPTIONS': dict(parse_qsl(parts.query)),
+    }
+
+
+def database_settings(url, base_dir, conn_max_age=None, conn_health_checks=True, sqlite_pragmas=None,
+                      sqlite_transaction_mode='IMMEDIATE'):
+    """
+    ``DATABASES['default']`` for ``url`` with the connection profile applied.
+
+    Server databases keep connections open for ``conn_max_age`` seconds
+    (default 60) and check them before reuse. SQLite connections are cheap
+    to open, so they default to per-request connections; its
+    ``sqlite_pragmas`` are applied by the backend on connect.
+    """
+    database = parse_database_url(url, base_dir)
+    conn_max_age = None if conn_max_age in (None, '') else int(conn_max_age)
+    if database['ENGINE'] == ENGINES['sqlite']:
+        database['CONN_MAX_AGE'] = conn_max_age or 0
+        database['PRAGMAS'] = dict(sqlite_pragmas or {})
+        database['TRANSACTION_MODE'] = sqlite_transaction_mode
+    else:
+        database['CONN_MAX_AGE'] = 60 if conn_max_age is None else conn_max_age
+        database['CONN_HEALTH_CHECKS'] = conn_health_checks
+    return database
@@ -0,0 +1,239 @@
+"""
+Request-level performance instrumentation.
+
+``InstrumentationMiddleware`` opens a ``RequestMetrics`` collector for each
+request in a context variable. Code on the request path reports into it
+through ``measure()`` (the encrypt/decrypt helpers and the transaction
+serializers do) and a database execute wrapper counts and times every
+query. When the response is ready the collected phases are
+
+* added to the ``Server-Timing`` header when ``REQUEST_TIMING`` is enabled,
+* folded into per-endpoint histograms that ``metrics_view`` renders in the
+  Prometheus text exposition format.
+
+Histograms are kept per process; with several workers each one exposes its
+own series, so scrape every worker or aggregate with the ``instance`` label.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+_current = ContextVar('request_metrics', default=None)
+
+# Phases reported by measure(); db is recorded by the query wrapper
+PHASES = ('db', 'encrypt', 'decrypt', 'serialize')
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class RequestMetrics:
+    """Call counts and accumulated seconds per phase for a single request"""
+
+    def __init__(self):
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+    def add(self, phase, seconds, count=1):
+        self.counts[phase] = self.counts.get(phase, 0) + count
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def measure(phase, count=1):
+    """Time the enclosed block into the current request's ``phase``"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(phase, time.perf_counter() - start, count)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add('db', time.perf_counter() - start)
+
+
+def install_query_wrapper(connection):
+    # execute_wrappers survive reconnects, so install the wrapper only once
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+@receiver(connection_created)
+def _install_on_connect(sender, connection, **kwargs):
+    install_query_wrapper(connection)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Per-endpoint histograms of request duration, query count and phase time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.durations = {}
+        self.queries = {}
+        self.phases = {}
+        self.operations = {}
+
+    @staticmethod
+    def _histogram(store, key, buckets):
+        histogram = store.get(key)
+        if histogram is None:
+            histogram = store[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, endpoint, method, status, duration, metrics):
+        key = (endpoint, method)
+        with self._lock:
+            self._histogram(self.durations, (*key, str(status)), DURATION_BUCKETS).observe(duration)
+            self._histogram(self.queries, key, COUNT_BUCKETS).observe(metrics.counts['db'])
+            for phase in PHASES:
+                self._histogram(self.phases, (*key, phase), DURATION_BUCKETS).observe(metrics.seconds[phase])
+            for phase in ('encrypt', 'decrypt'):
+                self._histogram(self.operations, (*key, phase), COUNT_BUCKETS).observe(metrics.counts[phase])
+
+    def render(self):
+        lines = []
+        with self._lock:
+            self._render(lines, 'pwa_request_duration_seconds', 'Request duration',
+                         ('endpoint', 'method', 'status'), self.durations)
+            self._render(lines, 'pwa_request_db_queries', 'Database queries per request',
+                         ('endpoint', 'method'), self.queries)
+            self._render(lines, 'pwa_request_phase_seconds', 'Time per request spent in db, encrypt, decrypt and serialize',
+                         ('endpoint', 'method', 'phase'), self.phases)
+            self._render(lines, 'pwa_request_crypto_operations', 'Encrypt/decrypt calls per request',
+                         ('endpoint', 'method', 'operation'), self.operations)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render(lines, name, help_text, label_names, store):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(store.items()):
+            labels = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def endpoint_label(request):
+    """The URL pattern that served the request, so ids do not explode the label set"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route
+
+
+def server_timing(metrics, total):
+    entries = [
+        '%s;desc="%d calls";dur=%.3f' % (phase, metrics.counts[phase], metrics.seconds[phase] * 1000)
+        for phase in PHASES if metrics.counts[phase]
+    ]
+    entries.append('total;dur=%.3f' % (total * 1000))
+    return ', '.join(entries)
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS', True)
+        # Connections opened before this module was imported missed connection_created
+        for connection in connections.all(initialized_only=True):
+            install_query_wrapper(connection)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        if not self.enabled:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def _acall(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        registry.observe(endpoint_label(request), request.method, response.status_code, total, metrics)
+        if getattr(settings, 'REQUEST_TIMING', False):
+            timing = server_timing(metrics, total)
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus text endpoint; requires ``Bearer METRICS_TOKEN`` and is a 404
+    while METRICS_TOKEN is unset, whatever DEBUG says
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404()
+    if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,159 @@
+"""
+Route-dependent middleware profiles and per-layer request timing.
+
+``RouteProfileMiddleware`` is the only entry in ``MIDDLEWARE``. It builds
+two chains from ``MIDDLEWARE_API`` and ``MIDDLEWARE_FULL`` and picks one per
+request: JSON API routes (``API_PATH_PREFIX``) skip sessions, CSRF, messages
+and the Django auth middleware, which they never use, while ``/admin/`` and
+everything else keep the full stack. ``API_PROFILE=full`` runs the full
+stack everywhere.
+
+With ``REQUEST_TIMING`` enabled every middleware layer is timed and the
+exclusive cost of each layer (and of each DRF authenticator, see
+``pwa_backend.authentication``) is reported in a ``Server-Timing`` header.
+"""
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def record_timing(request, name, seconds):
+    """Add a timing entry to the request when REQUEST_TIMING is enabled"""
+    timings = getattr(request, 'layer_timings', None)
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+class _LayerTimer:
+    """Records the inclusive time spent in a middleware layer and everything inside it"""
+
+    def __init__(self, name, get_response):
+        self.name = name
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        start = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            request.inclusive_timings[self.name] = time.perf_counter() - start
+
+    async def _acall(self, request):
+        start = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            request.inclusive_timings[self.name] = time.perf_counter() - start
+
+
+class MiddlewareChain:
+    """A middleware chain built like Django's handler builds settings.MIDDLEWARE"""
+
+    def __init__(self, paths, get_response, timed=False):
+        self.names = [path.rsplit('.', 1)[-1] for path in paths]
+        self.view_hooks = []
+        self.exception_hooks = []
+        self.template_response_hooks = []
+
+        handler = _LayerTimer('view', get_response) if timed else get_response
+        for path, name in reversed(list(zip(paths, self.names))):
+            instance = import_string(path)(handler)
+            if hasattr(instance, 'process_view'):
+                self.view_hooks.insert(0, instance.process_view)
+            if hasattr(instance, 'process_exception'):
+                self.exception_hooks.append(instance.process_exception)
+            if hasattr(instance, 'process_template_response'):
+                self.template_response_hooks.append(instance.process_template_response)
+            handler = convert_exception_to_response(instance)
+            if timed:
+                handler = _LayerTimer(name, handler)
+        self.handler = handler
+
+    def exclusive_timings(self, inclusive):
+        """Subtract each layer's inner layers from its inclusive time"""
+        layers = [*self.names, 'view']
+        timings = []
+        for outer, inner in zip(layers, layers[1:]):
+            if outer in inclusive:
+                timings.append((f'mw.{outer}', inclusive[outer] - inclusive.get(inner, 0)))
+        return timings
+
+
+class RouteProfileMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.timed = getattr(settings, 'REQUEST_TIMING', False)
+        self.api_prefix = getattr(settings, 'API_PATH_PREFIX', '/api/')
+        full = MiddlewareChain(settings.MIDDLEWARE_FULL, get_response, timed=self.timed)
+        if getattr(settings, 'API_PROFILE', 'minimal') == 'minimal':
+            api = MiddlewareChain(settings.MIDDLEWARE_API, get_response, timed=self.timed)
+        else:
+            api = full
+        self.chains = {'api': api, 'full': full}
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def get_chain(self, request):
+        return self.chains['api' if request.path_info.startswith(self.api_prefix) else 'full']
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        chain = self.start(request)
+        return self.finish(request, chain, chain.handler(request))
+
+    async def _acall(self, request):
+        chain = self.start(request)
+        return self.finish(request, chain, await chain.handler(request))
+
+    def start(self, request):
+        chain = self.get_chain(request)
+        request.middleware_chain = chain
+        if self.timed:
+            request.layer_timings = []
+            request.inclusive_timings = {}
+        return chain
+
+    def finish(self, request, chain, response):
+        if self.timed:
+            timings = chain.exclusive_timings(request.inclusive_timings) + request.layer_timings
+            entries = ['%s;dur=%.3f' % (name, seconds * 1000) for name, seconds in timings]
+            if entries:
+                response['Server-Timing'] = ', '.join(entries)
+            logger.debug('%s %s %s', request.method, request.path, ', '.join(entries))
+        return response
+
+    # Hooks called by Django's handler for the middleware in MIDDLEWARE; they
+    # are forwarded to the middleware of the chain serving the request.
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for hook in request.middleware_chain.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_exception(self, request, exception):
+        for hook in request.middleware_chain.exception_hooks:
+            response = hook(request, exception)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        for hook in request.middleware_chain.template_response_hooks:
+            response = hook(request, response)
+        return response
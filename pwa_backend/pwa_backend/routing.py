@@ -0,0 +1,143 @@
+"""
+Read-replica routing for read-only API endpoints.
+
+``ReplicaRoutingMiddleware`` marks a request as replica-safe when it is a
+GET/HEAD to one of the URL names in ``REPLICA_ROUTES``; ``ReplicaRouter``
+then sends that request's reads to ``REPLICA_DATABASE``. Everything else
+(writes, other endpoints, management commands, background threads) stays
+on the primary.
+
+Read-your-writes: after an authenticated user's successful write the user
+is pinned to the primary for ``REPLICA_STICKY_SECONDS`` (set it above the
+replica lag). The pin is kept in the default cache, so use a shared cache
+backend when running several processes. The user is only known once the
+request is authenticated, so the authentication lookup itself may still
+read from the replica.
+"""
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import LazyObject
+
+_current = ContextVar('replica_routing', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def replica_alias():
+    """The configured replica alias, or None when reads stay on the primary"""
+    alias = getattr(settings, 'REPLICA_DATABASE', '')
+    return alias if alias and alias in settings.DATABASES else None
+
+
+def _sticky_key(user_id):
+    return f'db-sticky:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Route ``user_id``'s replica-safe reads to the primary for a while"""
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+    if seconds:
+        cache.set(_sticky_key(user_id), time.time(), seconds)
+
+
+def is_pinned(user_id):
+    return cache.get(_sticky_key(user_id)) is not None
+
+
+def _authenticated_user_id(request):
+    # Only look at a user set by authentication; evaluating a lazy
+    # session user here would run a query from inside the router
+    user = request.__dict__.get('user')
+    if user is None or isinstance(user, LazyObject) or not user.is_authenticated:
+        return None
+    return user.pk
+
+
+class RoutingState:
+    """Per-request routing decision, consulted by ReplicaRouter"""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica_safe = False
+        self._pinned = {}
+
+    def read_alias(self):
+        if not self.replica_safe:
+            return None
+        user_id = _authenticated_user_id(self.request)
+        if user_id is not None:
+            if user_id not in self._pinned:
+                self._pinned[user_id] = is_pinned(user_id)
+            if self._pinned[user_id]:
+                return None
+        return replica_alias()
+
+
+class ReplicaRouter:
+    """Sends reads of replica-safe requests to REPLICA_DATABASE"""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None:
+            return None
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica rows are copies of primary rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db != replica_alias()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.routes = frozenset(getattr(settings, 'REPLICA_ROUTES', ()))
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        token = _current.set(RoutingState(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response)
+        return response
+
+    async def _acall(self, request):
+        token = _current.set(RoutingState(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _current.get()
+        if state is not None and request.method in SAFE_METHODS:
+            state.replica_safe = request.resolver_match.url_name in self.routes
+        return None
+
+    def finish(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user_id = _authenticated_user_id(request)
+        if user_id is not None and replica_alias():
+            pin_to_primary(user_id)
@@ -5,6 +5,8 @@ Django settings for pwa_backend project.
 from pathlib import Path
 import os
 
+from decouple import Csv, config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,7 +35,23 @@ INSTALLED_APPS = [
 
 ]
 
-MIDDLEWARE = [
+# Request profile: "minimal" serves /api/ with MIDDLEWARE_API and JWT plus
+# DRF token authentication; "full" uses the complete middleware and auth stack
+# everywhere
+API_PROFILE = config('API_PROFILE', default='minimal').lower()
+API_PATH_PREFIX = '/api/'
+
+# Report per-middleware, per-authenticator and per-phase (db, encrypt, decrypt,
+# serialize) time in a Server-Timing header
+REQUEST_TIMING = config('REQUEST_TIMING', default=False, cast=bool)
+
+# Collect per-request query/crypto/serialization metrics for /metrics/
+# (served only to requests bearing METRICS_TOKEN; a 404 while it is unset)
+REQUEST_METRICS = config('REQUEST_METRICS', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Full stack, used for /admin/ and any non-API route
+MIDDLEWARE_FULL = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -44,6 +62,25 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# JSON API routes authenticate with bearer tokens and need no sessions,
+# CSRF, messages or frame options
+MIDDLEWARE_API = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+# RouteProfileMiddleware picks MIDDLEWARE_API or MIDDLEWARE_FULL per request
+MIDDLEWARE = [
+    'pwa_backend.instrumentation.InstrumentationMiddleware',
+    'pwa_backend.routing.ReplicaRoutingMiddleware',
+    'pwa_backend.middleware.RouteProfileMiddleware',
+]
+
+# The admin checks look for the session/auth/messages middleware in
+# MIDDLEWARE; they run for /admin/ as part of MIDDLEWARE_FULL
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = 'pwa_backend.urls'
 
 TEMPLATES = [
@@ -65,13 +102,79 @@ TEMPLATES = [
 WSGI_APPLICATION = 'pwa_backend.wsgi.application'
 
 # Database
+# DATABASE_URL selects the database (see pwa_backend/database.py); it is read
+# from the environment or from the .env file that setup.py writes.
+# SQLite runs with the pragmas below on every connection; server databases
+# keep health-checked connections open for DB_CONN_MAX_AGE seconds.
+from .database import database_settings
+
+DATABASE_URL = config('DATABASE_URL', default='sqlite:///db.sqlite3')
+DATABASE_PROFILE = {
+    'conn_max_age': config('DB_CONN_MAX_AGE', default=None),
+    'conn_health_checks': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    'sqlite_pragmas': {
+        'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+        'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+        'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+        'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+    },
+    'sqlite_transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+}
 DATABASES = {
+    'default': database_settings(DATABASE_URL, BASE_DIR, **DATABASE_PROFILE),
+}
+
+# Read replica (optional): GET/HEAD requests to the REPLICA_ROUTES url names
+# read from DATABASE_REPLICA_URL, except for users who wrote within the last
+# REPLICA_STICKY_SECONDS (see pwa_backend/routing.py)
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default='')
+REPLICA_DATABASE = 'replica' if DATABASE_REPLICA_URL else ''
+if REPLICA_DATABASE:
+    DATABASES[REPLICA_DATABASE] = database_settings(DATABASE_REPLICA_URL, BASE_DIR, **DATABASE_PROFILE)
+    if 'PRAGMAS' in DATABASES[REPLICA_DATABASE]:
+        # A SQLite replica stand-in only reads: refuse writes and never take the write lock
+        DATABASES[REPLICA_DATABASE]['PRAGMAS']['query_only'] = 'ON'
+        DATABASES[REPLICA_DATABASE]['TRANSACTION_MODE'] = 'DEFERRED'
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+REPLICA_ROUTES = (
+    'transaction-list-create',
+    'transaction-detail',
+    'transaction-stats',
+    'transaction-balance-series',
+    'user-profile',
+    'verify-token',
+    'async-transaction-list',
+    'async-transaction-detail',
+    'async-transaction-stats',
+    'async-user-profile',
+)
+DATABASE_ROUTERS = ['pwa_backend.routing.ReplicaRouter']
+
+# Cache
+# Local memory by default (LRU culling at MAX_ENTRIES, TTL per entry). Set
+# CACHE_BACKEND/CACHE_LOCATION to a shared backend such as
+# django.core.cache.backends.redis.RedisCache when running several processes.
+CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default='pwa-backend'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Per-user response cache for the list, stats and profile endpoints. Off by
+# default with the local-memory cache: a write would only invalidate the
+# responses cached by the process that handled it
+RESPONSE_CACHE_ENABLED = config(
+    'RESPONSE_CACHE_ENABLED', default=not CACHE_BACKEND.endswith('LocMemCache'), cast=bool,
+)
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,12 +204,23 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+API_AUTHENTICATION_CLASSES = {
+    'minimal': [
+        'accounts.authentication.CachedUserJWTAuthentication',
+        # Tokens from /api/auth/login/; only consulted for "Token ..." headers
+        'rest_framework.authentication.TokenAuthentication',
+    ],
+    'full': [
+        'accounts.authentication.CachedUserJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
+}[API_PROFILE]
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        ['pwa_backend.authentication.TimedAuthentication'] if REQUEST_TIMING else API_AUTHENTICATION_CLASSES
+    ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -142,5 +256,54 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Let the PWA revalidate with conditional GETs and read the validators
+from corsheaders.defaults import default_headers
+
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match', 'if-modified-since')
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
+
 # Encryption settings
-ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY', 'your-32-byte-encryption-key-here-change-in-production') 
\ No newline at end of file
+ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY', 'your-32-byte-encryption-key-here-change-in-production') 
+
+# Previous encryption keys, comma separated and newest first. They are only
+# used to decrypt; keep them until rotate_encryption_key has finished.
+ENCRYPTION_OLD_KEYS = [key for key in config('ENCRYPTION_OLD_KEYS', default='', cast=Csv()) if key]
+
+# Threads used to encrypt/decrypt large transaction batches (0 disables the pool)
+TRANSACTION_CRYPTO_WORKERS = config('TRANSACTION_CRYPTO_WORKERS', default=0, cast=int)
+TRANSACTION_CRYPTO_MIN_BATCH = 256
+
+# Delta sync: tombstones/idempotency records older than this force a full resync
+SYNC_TOMBSTONE_RETENTION_DAYS = 30
+SYNC_OVERLAP_SECONDS = 5
+SYNC_MAX_CHANGES = 500
+
+# Maximum number of items accepted by /api/transactions/bulk/
+TRANSACTION_BULK_MAX_ITEMS = 5000
+
+# Largest number of points /api/transactions/balance-series/ returns
+BALANCE_SERIES_MAX_POINTS = 1000
+
+# Rows fetched and decrypted per chunk by /api/transactions/export/
+TRANSACTION_EXPORT_CHUNK_SIZE = 500
+
+# Statement imports: background worker threads (0 processes the upload inline)
+# and rows committed per database transaction
+TRANSACTION_IMPORT_WORKERS = config('TRANSACTION_IMPORT_WORKERS', default=2, cast=int)
+TRANSACTION_IMPORT_CHUNK_SIZE = 500
+
+# Key for the blind search index over encrypted titles/descriptions. Empty
+# means the index follows ENCRYPTION_KEY: searches also match tokens under
+# ENCRYPTION_OLD_KEYS and rotate_encryption_key reindexes as it goes. Run
+# rebuild_search_index after setting or changing it.
+SEARCH_INDEX_KEY = config('SEARCH_INDEX_KEY', default='')
+
+# Threads that decrypt and serialize rows for the async (ASGI) read endpoints
+ASYNC_CRYPTO_WORKERS = config('ASYNC_CRYPTO_WORKERS', default=4, cast=int)
+
+# Seconds a user row is cached in-process by JWT authentication; bounds how
+# long a deactivation or profile edit takes to reach other processes
+# (see accounts.authentication)
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=30, cast=int)
+# Most user rows each process keeps; the least recently used are evicted
+JWT_USER_CACHE_MAX_ENTRIES = config('JWT_USER_CACHE_MAX_ENTRIES', default=10000, cast=int)
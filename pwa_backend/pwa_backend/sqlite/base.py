@@ -0,0 +1,35 @@
+"""
+SQLite backend that applies the settings' ``PRAGMAS`` to every connection.
+
+Configured by ``pwa_backend.database`` for ``sqlite://`` URLs. Besides the
+pragmas (journal_mode, synchronous, mmap_size, busy_timeout, ...) it honours
+``TRANSACTION_MODE``: atomic blocks start with ``BEGIN IMMEDIATE`` by
+default, so a writer waits for the lock up to busy_timeout when its
+transaction starts. With the default deferred ``BEGIN``, a transaction that
+reads and then writes fails straight away with "database is locked" when
+another connection is writing, because SQLite cannot wait for a read lock
+to be upgraded.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, settings_dict, *args, **kwargs):
+        super().__init__(settings_dict, *args, **kwargs)
+        mode = (settings_dict.get('TRANSACTION_MODE') or 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f'TRANSACTION_MODE must be one of {", ".join(TRANSACTION_MODES)}')
+        self.transaction_mode = mode
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, value in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -5,11 +5,14 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken.views import obtain_auth_token
 from transactions.views import register_user
+from .instrumentation import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics_view, name='metrics'),
     path('api/auth/login/', obtain_auth_token, name='api_token_auth'),
     path('api/auth/register/', register_user, name='register_user'),
+    path('api/async/', include('transactions.async_urls')),
     path('api/', include('transactions.urls')),
     path('api/accounts/', include('accounts.urls')),
 ] 
\ No newline at end of file
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('transactions/', async_views.transaction_list, name='async-transaction-list'),
+    path('transactions/<int:pk>/', async_views.transaction_detail, name='async-transaction-detail'),
+    path('transactions/stats/', async_views.transaction_stats, name='async-transaction-stats'),
+    path('user/profile/', async_views.user_profile, name='async-user-profile'),
+]
@@ -0,0 +1,157 @@
+"""
+Async (ASGI) variants of the read endpoints.
+
+These views run natively on the event loop when the project is served by an
+ASGI server such as uvicorn: rows are fetched with the async ORM
+(``aiterator``/``aget``) and only the CPU-bound part of a
+request -- Fernet decryption and serialization -- is handed to a bounded
+thread pool (``ASYNC_CRYPTO_WORKERS``), so one slow page cannot starve the
+loop of the other requests it is serving.
+
+Responses have the same shape as the DRF views in ``views.py``; the
+per-user response cache and conditional GET handling stay on the WSGI
+endpoints.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from accounts.authentication import check_user, token_user_id, user_cache
+
+from .filters import filter_transactions
+from .ledger import summary_row, summary_values
+from .models import Transaction
+from .pagination import TransactionCursorPagination
+from .search import search_transactions
+from .serializers import TransactionSerializer, UserSerializer
+from .stats import build_stats, grouped_rows, ledger_summary_queryset, validate_group_by
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared thread pool used for decryption and serialization"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'ASYNC_CRYPTO_WORKERS', 4)
+            _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='async-crypto')
+        return _executor
+
+
+async def run_in_executor(func, *args):
+    loop = asyncio.get_running_loop()
+    # Carry the request's context (e.g. its instrumentation metrics) into the pool thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args))
+
+
+async def authenticate(request):
+    """
+    Resolve the Bearer JWT of a plain Django request to an active user.
+
+    Token validation is pure CPU work; a user missing from ``user_cache`` is
+    looked up through the async ORM.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise NotAuthenticated()
+
+    token = authenticator.get_validated_token(raw_token)
+    return check_user(await user_cache.aget(token_user_id(token)))
+
+
+def async_api_view(view):
+    """
+    Authenticate the request and render DRF API exceptions as JSON, the
+    same way the DRF exception handler does for the sync views.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        try:
+            user = await authenticate(request)
+            request = Request(request)
+            request.user = user
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = JsonResponse(detail, status=exc.status_code, safe=False)
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+
+    return wrapper
+
+
+def _serialize_transactions(rows, request, many=True):
+    serializer = TransactionSerializer(rows, many=many, context={'request': request})
+    return serializer.data
+
+
+@async_api_view
+async def transaction_list(request):
+    """Async GET /api/async/transactions/ (same parameters as the sync list)"""
+    user = request.user
+    queryset = filter_transactions(Transaction.objects.filter(user=user), request.query_params)
+    query = request.query_params.get('q')
+    if query:
+        queryset = search_transactions(queryset, user, query)
+
+    paginator = TransactionCursorPagination()
+    page = paginator.page_queryset(queryset, request)
+    rows = [row async for row in (queryset if page is None else page).aiterator()]
+    for row in rows:
+        # Avoid a lazy (synchronous) user query per row during serialization
+        row.user = user
+
+    if page is None:
+        data = await run_in_executor(_serialize_transactions, rows, request)
+        return JsonResponse(data, safe=False)
+
+    data = await run_in_executor(_serialize_transactions, paginator.set_page(rows), request)
+    return JsonResponse({'next': paginator.get_next_link(), 'results': data})
+
+
+@async_api_view
+async def transaction_detail(request, pk):
+    """Async GET /api/async/transactions/<pk>/"""
+    try:
+        instance = await Transaction.objects.aget(pk=pk, user=request.user)
+    except Transaction.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    instance.user = request.user
+    data = await run_in_executor(_serialize_transactions, instance, request, False)
+    return JsonResponse(data)
+
+
+@async_api_view
+async def transaction_stats(request):
+    """Async GET /api/async/transactions/stats/ (same parameters as the sync stats)"""
+    group_by = validate_group_by(request.query_params.get('group_by') or None)
+    summaries = ledger_summary_queryset(request.user, request.query_params)
+    if summaries is not None:
+        rows = [summary_row(row) async for row in summary_values(summaries).aiterator()]
+    else:
+        transactions = filter_transactions(Transaction.objects.filter(user=request.user), request.query_params)
+        rows = [row async for row in grouped_rows(transactions, group_by).aiterator()]
+    return JsonResponse(build_stats(rows, group_by=group_by))
+
+
+@async_api_view
+async def user_profile(request):
+    """Async GET /api/async/user/profile/"""
+    return JsonResponse(UserSerializer(request.user).data)
+
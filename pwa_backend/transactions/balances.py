@@ -0,0 +1,130 @@
+"""
+Balance-over-time series served from the DailyBalance prefix sums.
+
+The opening balance is one index lookup (the latest row before the range)
+and the series is a single range scan over the days that have
+transactions, however long the user's history is.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .filters import parse_date_param
+from .models import DailyBalance
+
+INTERVAL_CHOICES = ('day', 'week', 'month')
+
+
+def period_start(date, interval):
+    """First day of the day, ISO week (Monday) or month containing ``date``"""
+    if interval == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if interval == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def next_period(start, interval):
+    if interval == 'week':
+        return start + datetime.timedelta(days=7)
+    if interval == 'month':
+        return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def balance_at(user, date):
+    """Balance after every transaction on or before ``date``"""
+    balance = DailyBalance.objects.filter(user=user, date__lte=date).order_by('-date').values_list(
+        'balance', flat=True
+    ).first()
+    return balance if balance is not None else Decimal('0')
+
+
+def balance_series(user, date_from, date_to, interval):
+    """
+    Closing balance and net change for each period between the two dates.
+
+    The first and last periods are clipped to the requested range.
+    """
+    opening = balance_at(user, date_from - datetime.timedelta(days=1))
+    days = iter(
+        DailyBalance.objects.filter(user=user, date__gte=date_from, date__lte=date_to)
+        .order_by('date').values_list('date', 'balance')
+    )
+    day = next(days, None)
+
+    points = []
+    balance = previous = opening
+    start = period_start(date_from, interval)
+    while start <= date_to:
+        end = min(next_period(start, interval) - datetime.timedelta(days=1), date_to)
+        while day is not None and day[0] <= end:
+            balance = day[1]
+            day = next(days, None)
+        points.append({
+            'period': max(start, date_from).isoformat(),
+            'date': end.isoformat(),
+            'balance': float(balance),
+            'net': float(balance - previous),
+        })
+        previous = balance
+        start = next_period(start, interval)
+    return opening, points
+
+
+def _count_periods(date_from, date_to, interval):
+    if interval == 'week':
+        return (period_start(date_to, 'week') - period_start(date_from, 'week')).days // 7 + 1
+    if interval == 'month':
+        return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+    return (date_to - date_from).days + 1
+
+
+def series_range(user, params):
+    """
+    Validate ``from``/``to``/``interval`` and return ``(from, to, interval)``.
+
+    ``to`` defaults to today and ``from`` to the user's first transaction.
+    """
+    interval = params.get('interval') or 'day'
+    if interval not in INTERVAL_CHOICES:
+        raise ValidationError({'interval': f'Expected one of: {", ".join(INTERVAL_CHOICES)}.'})
+    date_to = parse_date_param(params, 'to') or timezone.localdate()
+    date_from = parse_date_param(params, 'from')
+    if date_from is None:
+        first = DailyBalance.objects.filter(user=user, date__lte=date_to).order_by('date').values_list(
+            'date', flat=True
+        ).first()
+        date_from = first or date_to
+    if date_from > date_to:
+        raise ValidationError({'from': 'from must not be after to.'})
+
+    max_points = getattr(settings, 'BALANCE_SERIES_MAX_POINTS', 1000)
+    if _count_periods(date_from, date_to, interval) > max_points:
+        raise ValidationError({
+            'interval': f'The range has more than {max_points} {interval} periods; use a shorter range or a longer interval.',
+        })
+    return date_from, date_to, interval
+
+
+def request_series_range(request):
+    """series_range() for a DRF request, resolved once and shared by the cache, validator and view"""
+    if not hasattr(request, '_balance_series_range'):
+        request._balance_series_range = series_range(request.user, request.query_params)
+    return request._balance_series_range
+
+
+def balance_series_payload(user, date_from, date_to, interval):
+    """Build the balance-series response for a range returned by series_range()"""
+    opening, points = balance_series(user, date_from, date_to, interval)
+    return {
+        'from': date_from.isoformat(),
+        'to': date_to.isoformat(),
+        'interval': interval,
+        'opening_balance': float(opening),
+        'closing_balance': points[-1]['balance'] if points else float(opening),
+        'points': points,
+    }
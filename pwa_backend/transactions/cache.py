@@ -0,0 +1,144 @@
+"""
+Per-user response cache with write-through invalidation.
+
+Each user has a ledger version counter in the cache. Every Transaction write
+bumps it once the database transaction commits, which makes all cached
+responses for that user unreachable at once. Cached GET responses are keyed
+on (user, version, path and query) and carry a strong ETag derived from the
+same key, so a browser revalidation that still matches is answered with 304
+before any database or decryption work.
+
+The counter lives in the cache backend, so deployments with several worker
+processes must point ``RESPONSE_CACHE_ALIAS`` at a shared backend (Redis,
+Memcached); the default local-memory cache is only coherent within a single
+process, and the cache is off by default with it. The counter expires after
+``RESPONSE_CACHE_TIMEOUT`` like the responses, so a process that missed a
+bump serves stale data for no longer than that.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import parse_http_date
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+# Response headers stored alongside the cached data
+CACHED_HEADERS = ('Last-Modified',)
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f'ledger-version:{user_id}'
+
+
+def _version_timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def get_ledger_version(user_id):
+    """Return the user's current ledger version, creating it if missing"""
+    cache = get_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a counter lost to expiry, eviction or a
+        # restart never reuses a version that earlier cached responses were
+        # stored under
+        cache.add(key, time.time_ns(), timeout=_version_timeout())
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+def bump_ledger_version(user_id):
+    cache = get_cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=_version_timeout())
+
+
+def invalidate_ledgers(user_ids, using=None):
+    """Bump the ledger version of each user after the current transaction commits"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    def bump():
+        for user_id in user_ids:
+            bump_ledger_version(user_id)
+
+    db_transaction.on_commit(bump, using=using)
+
+
+def _cache_key(request, version, vary=()):
+    digest = hashlib.sha256('|'.join([request.get_full_path(), *map(str, vary)]).encode()).hexdigest()[:32]
+    return f'response:{request.user.pk}:{version}:{digest}'
+
+
+def _etag(cache_key):
+    return '"%s"' % hashlib.sha256(cache_key.encode()).hexdigest()[:40]
+
+
+def _finalize(response, etag):
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Authorization'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def cache_per_user(view=None, *, vary=None):
+    """
+    Cache the data of successful GET responses per user and ledger version.
+
+    Works on DRF function views and on view methods; the wrapped callable
+    must receive the DRF request as its first non-self argument. ``vary``,
+    if given, is called with the request and its result is added to the
+    key, for responses that depend on more than the path and the ledger
+    (such as today's date).
+    """
+    if view is None:
+        return functools.partial(cache_per_user, vary=vary)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        enabled = getattr(settings, 'RESPONSE_CACHE_ENABLED', False)
+        if not enabled or request.method != 'GET' or not request.user.is_authenticated:
+            return view(*args, **kwargs)
+
+        cache = get_cache()
+        key = _cache_key(request, get_ledger_version(request.user.pk), vary(request) if vary else ())
+        etag = _etag(key)
+
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            return _finalize(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            if 'Last-Modified' in headers:
+                not_modified = get_conditional_response(
+                    request, last_modified=parse_http_date(headers['Last-Modified']),
+                )
+                if not_modified is not None:
+                    return _finalize(not_modified, etag)
+            return _finalize(Response(data, headers=headers), etag)
+
+        response = view(*args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+            cache.set(key, (response.data, headers), timeout=_version_timeout())
+            _finalize(response, etag)
+        return response
+
+    return wrapper
@@ -0,0 +1,108 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the transactions API.
+
+Validators are computed with a single cheap query (or none at all) before
+any rows are loaded, decrypted or serialized, so a client revalidating an
+unchanged resource gets a 304 for the cost of that query.
+"""
+import datetime
+import functools
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.request import Request
+
+from .balances import request_series_range
+from .models import Transaction, TransactionTombstone
+
+
+def _digest(*parts):
+    return '"%s"' % hashlib.sha256('|'.join(str(p) for p in parts).encode()).hexdigest()[:40]
+
+
+def ledger_validator(request, *args, **kwargs):
+    """
+    Validator for the user's whole ledger (list and stats).
+
+    MAX(updated_at) and COUNT change on every create/update/delete; the
+    newest tombstone moves Last-Modified forward on deletes.
+    """
+    user = request.user
+    transactions = Transaction.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    tombstones = TransactionTombstone.objects.filter(user=OuterRef('pk')).order_by().values('user')
+    row = type(user).objects.filter(pk=user.pk).values(
+        last_updated=Subquery(transactions.annotate(value=Max('updated_at')).values('value')),
+        count=Subquery(transactions.annotate(value=Count('id')).values('value')),
+        last_deleted=Subquery(tombstones.annotate(value=Max('deleted_at')).values('value')),
+    ).first() or {}
+
+    moments = [m for m in (row.get('last_updated'), row.get('last_deleted')) if m is not None]
+    last_modified = max(moments) if moments else None
+    etag = _digest(user.pk, row.get('last_updated'), row.get('count'), row.get('last_deleted'),
+                   request.get_full_path())
+    return etag, last_modified
+
+
+def balance_series_validator(request, *args, **kwargs):
+    """
+    Validator for the balance series: the ledger validator plus the resolved
+    range, since ``to`` defaults to today and the series grows a point each
+    day with no write. With the default ``to``, Last-Modified is at least
+    the start of today.
+    """
+    etag, last_modified = ledger_validator(request)
+    date_from, date_to, interval = request_series_range(request)
+    if not request.query_params.get('to'):
+        midnight = timezone.make_aware(datetime.datetime.combine(date_to, datetime.time.min))
+        last_modified = max(last_modified, midnight) if last_modified else midnight
+    return _digest(etag, date_from, date_to, interval), last_modified
+
+
+def transaction_validator(request, *args, pk=None, **kwargs):
+    """Validator for a single transaction; None lets the view return its 404"""
+    updated_at = Transaction.objects.filter(user=request.user, pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    return _digest(request.user.pk, pk, updated_at, request.get_full_path()), updated_at
+
+
+def profile_validator(request, *args, **kwargs):
+    """Validator for the profile, built from the already-loaded user (no query)"""
+    user = request.user
+    return _digest(user.pk, user.username, user.email, user.first_name, user.last_name), None
+
+
+def conditional_response(validator):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 from ``validator``
+    before running the view, and attach ETag/Last-Modified to 200 responses.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+                return view(*args, **kwargs)
+
+            validators = validator(request, **kwargs)
+            if validators is None:
+                return view(*args, **kwargs)
+            etag, last_modified = validators
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if not_modified is not None:
+                patch_vary_headers(not_modified, ['Authorization'])
+                return not_modified
+
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                response.setdefault('ETag', etag)
+                if timestamp is not None:
+                    response.setdefault('Last-Modified', http_date(timestamp))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,44 @@
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import Transaction
+
+
+def parse_date_param(params, name):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Invalid date, expected YYYY-MM-DD.'})
+    return parsed
+
+
+def filter_transactions(queryset, params):
+    """
+    Apply the shared query-string filters to a Transaction queryset.
+
+    Supported parameters: ``date_from`` and ``date_to`` (inclusive,
+    YYYY-MM-DD) and ``transaction_type``.
+    """
+    date_from = parse_date_param(params, 'date_from')
+    date_to = parse_date_param(params, 'date_to')
+    if date_from and date_to and date_from > date_to:
+        raise ValidationError({'date_from': 'date_from must not be after date_to.'})
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+
+    transaction_type = params.get('transaction_type')
+    if transaction_type:
+        valid_types = dict(Transaction.TRANSACTION_TYPES)
+        if transaction_type not in valid_types:
+            raise ValidationError({'transaction_type': f'Unknown transaction type "{transaction_type}".'})
+        queryset = queryset.filter(transaction_type=transaction_type)
+
+    return queryset
@@ -0,0 +1,274 @@
+"""
+Background import of bank statements (CSV and OFX).
+
+The upload is spooled to a temporary file and an ImportJob is returned
+immediately. A small worker pool then parses the file as a stream, maps rows
+to Transaction.TRANSACTION_TYPES, drops duplicates by fingerprint (date,
+amount, title hash) and commits in chunks, so neither the request worker nor
+the database is held for the length of the file.
+"""
+import codecs
+import csv
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import close_old_connections, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ledger import CENT
+from .models import ImportJob, Transaction
+from .utils import transaction_fingerprint
+
+logger = logging.getLogger(__name__)
+
+MAX_RECORDED_ERRORS = 50
+# Transaction.amount is max_digits=10 with 2 decimal places
+MAX_AMOUNT = Decimal('100000000')
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y', '%Y%m%d')
+
+# Keyword hints for mapping free-text rows onto TRANSACTION_TYPES
+TYPE_KEYWORDS = [
+    ('salary', ('salary', 'payroll', 'wage', 'freelance', 'bonus')),
+    ('grocery', ('grocery', 'groceries', 'supermarket', 'walmart', 'market', 'bakery')),
+    ('fees', ('fee', 'bill', 'charge', 'interest', 'tax', 'insurance', 'rent', 'utility')),
+    ('entertainment', ('movie', 'cinema', 'netflix', 'spotify', 'concert', 'game', 'restaurant')),
+    ('transport', ('fuel', 'gas station', 'uber', 'taxi', 'train', 'bus', 'metro', 'parking', 'airline')),
+]
+
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted date', 'value date'),
+    'amount': ('amount', 'value', 'transaction amount'),
+    'debit': ('debit', 'withdrawal', 'withdrawals'),
+    'credit': ('credit', 'deposit', 'deposits'),
+    'title': ('title', 'description', 'payee', 'name', 'narration', 'details'),
+    'description': ('memo', 'notes', 'reference'),
+    'type': ('type', 'category', 'transaction_type'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def parse_date(value):
+    value = (value or '').strip().split(' ')[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f'Unrecognised date "{value}"')
+
+
+def parse_amount(value):
+    """Parse a statement amount, rounded to cents and within Transaction.amount's range"""
+    cleaned = re.sub(r'[^\d.\-+()]', '', value or '')
+    negative = cleaned.startswith('(') and cleaned.endswith(')')
+    try:
+        amount = Decimal(cleaned.strip('()'))
+    except InvalidOperation:
+        raise ImportRowError(f'Unrecognised amount "{value}"')
+    # Round like the database does when it stores the row, so the ledger
+    # deltas match the stored amounts
+    if abs(amount) >= MAX_AMOUNT or abs(amount.quantize(CENT)) >= MAX_AMOUNT:
+        raise ImportRowError(f'Amount "{value}" is out of range')
+    amount = amount.quantize(CENT)
+    return -amount if negative else amount
+
+
+def map_transaction_type(raw_type, title):
+    """Map a statement category or payee text onto TRANSACTION_TYPES"""
+    valid = {key for key, _ in Transaction.TRANSACTION_TYPES}
+    labels = {label.lower(): key for key, label in Transaction.TRANSACTION_TYPES}
+    raw = (raw_type or '').strip().lower()
+    if raw in valid:
+        return raw
+    if raw in labels:
+        return labels[raw]
+    text = f'{raw} {title or ""}'.lower()
+    for transaction_type, keywords in TYPE_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return transaction_type
+    return 'other'
+
+
+def _resolve_columns(fieldnames):
+    normalized = {name.strip().lower(): name for name in fieldnames or [] if name}
+    columns = {}
+    for key, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[key] = normalized[alias]
+                break
+    if 'date' not in columns or not ({'amount', 'debit', 'credit'} & set(columns)):
+        raise ImportRowError('CSV needs a date column and an amount (or debit/credit) column')
+    return columns
+
+
+def iter_csv(stream):
+    """Yield (line_number, row dict) from a text stream without loading it whole"""
+    reader = csv.DictReader(stream)
+    columns = _resolve_columns(reader.fieldnames)
+    for row in reader:
+        line = reader.line_num
+        try:
+            if 'amount' in columns and (row.get(columns['amount']) or '').strip():
+                amount = parse_amount(row[columns['amount']])
+            else:
+                credit = (row.get(columns.get('credit'), '') or '').strip()
+                debit = (row.get(columns.get('debit'), '') or '').strip()
+                amount = parse_amount(credit) if credit else -abs(parse_amount(debit))
+            title = (row.get(columns.get('title'), '') or '').strip() or 'Imported transaction'
+            yield line, {
+                'date': parse_date(row.get(columns['date'])),
+                'amount': amount,
+                'title': title[:200],
+                'description': (row.get(columns.get('description'), '') or '').strip(),
+                'transaction_type': map_transaction_type(row.get(columns.get('type')), title),
+            }
+        except ImportRowError as e:
+            yield line, e
+
+
+_OFX_TAG = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+
+def iter_ofx(stream):
+    """Yield (index, row dict) for each <STMTTRN> block of an OFX/QFX statement"""
+    block = None
+    index = 0
+    for line in stream:
+        upper = line.upper()
+        if '<STMTTRN>' in upper:
+            block = {}
+        if block is not None:
+            for tag, value in _OFX_TAG.findall(line):
+                if value.strip():
+                    block[tag.upper()] = value.strip()
+        if '</STMTTRN>' in upper and block is not None:
+            index += 1
+            try:
+                title = block.get('NAME') or block.get('MEMO') or 'Imported transaction'
+                yield index, {
+                    'date': parse_date(block.get('DTPOSTED', '')[:8]),
+                    'amount': parse_amount(block.get('TRNAMT')),
+                    'title': title[:200],
+                    'description': block.get('MEMO', '') if block.get('NAME') else '',
+                    'transaction_type': map_transaction_type(block.get('TRNTYPE'), title),
+                }
+            except ImportRowError as e:
+                yield index, e
+            block = None
+
+
+def _record_error(errors, line, message):
+    if len(errors) < MAX_RECORDED_ERRORS:
+        errors.append({'line': line, 'error': str(message)})
+
+
+def _commit_chunk(job, chunk, seen):
+    fingerprints = {}
+    for data in chunk:
+        fingerprints.setdefault(transaction_fingerprint(data['date'], data['amount'], data['title']), data)
+    existing = set(
+        Transaction.objects.filter(user_id=job.user_id, fingerprint__in=list(fingerprints))
+        .values_list('fingerprint', flat=True)
+    )
+    new = [
+        Transaction(user_id=job.user_id, **data)
+        for fingerprint, data in fingerprints.items()
+        if fingerprint not in existing and fingerprint not in seen
+    ]
+    seen.update(fingerprints)
+    with db_transaction.atomic():
+        Transaction.objects.bulk_create(new)
+        ImportJob.objects.filter(pk=job.pk).update(
+            total_rows=F('total_rows') + len(chunk),
+            imported=F('imported') + len(new),
+            duplicates=F('duplicates') + len(chunk) - len(new),
+        )
+
+
+def process_import(job_id, path):
+    """Parse and import a spooled statement file; runs on a worker thread"""
+    close_old_connections()
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = 'running'
+    job.save(update_fields=['status'])
+    chunk_size = getattr(settings, 'TRANSACTION_IMPORT_CHUNK_SIZE', 500)
+    errors = []
+    failed = 0
+    seen = set()
+    try:
+        with codecs.open(path, 'r', encoding='utf-8-sig', errors='replace') as stream:
+            rows = iter_csv(stream) if job.file_format == 'csv' else iter_ofx(stream)
+            chunk = []
+            for line, row in rows:
+                if isinstance(row, Exception):
+                    failed += 1
+                    _record_error(errors, line, row)
+                    continue
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    _commit_chunk(job, chunk, seen)
+                    chunk = []
+            if chunk:
+                _commit_chunk(job, chunk, seen)
+        status = 'completed'
+    except Exception as e:
+        logger.exception('Import %s failed', job_id)
+        _record_error(errors, None, e)
+        status = 'failed'
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    ImportJob.objects.filter(pk=job_id).update(
+        status=status, errors=errors, failed_rows=F('failed_rows') + failed, finished_at=timezone.now(),
+    )
+    close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'TRANSACTION_IMPORT_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='import')
+        return _executor
+
+
+def start_import(user, uploaded_file, file_format):
+    """Spool the upload to disk, create the job and queue it for processing"""
+    suffix = f'.{file_format}'
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix='statement-') as spool:
+        for chunk in uploaded_file.chunks():
+            spool.write(chunk)
+    job = ImportJob.objects.create(user=user, file_format=file_format)
+
+    if getattr(settings, 'TRANSACTION_IMPORT_WORKERS', 2) == 0:
+        process_import(job.pk, spool.name)
+        job.refresh_from_db()
+    else:
+        db_transaction.on_commit(lambda: _get_executor().submit(process_import, job.pk, spool.name))
+    return job
+
+
+def detect_format(uploaded_file, requested=None):
+    if requested:
+        return requested.lower()
+    name = (uploaded_file.name or '').lower()
+    return 'ofx' if name.endswith(('.ofx', '.qfx')) else 'csv'
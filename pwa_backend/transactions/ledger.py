@@ -0,0 +1,343 @@
+"""
+Incremental maintenance of the per-user, per-month LedgerSummary table and
+the per-user, per-day DailyBalance prefix sums.
+
+Every write path on Transaction (save, delete, bulk_create, bulk_update and
+queryset update/delete) reduces its effect to a set of deltas keyed by
+(user_id, month, transaction_type) and (user_id, date) and applies them
+inside the same database transaction as the write.
+"""
+import datetime
+from bisect import bisect_left
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Value, When
+from django.utils.dateparse import parse_date
+
+TRACKED_FIELDS = ('user_id', 'date', 'transaction_type', 'amount')
+CENT = Decimal('0.01')
+# Changed days applied per DailyBalance UPDATE, bounding its parameter count
+DAY_CHUNK_SIZE = 500
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, str):
+        return parse_date(value)
+    return value
+
+
+def _as_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def snapshot(instance):
+    """
+    Return the ledger-relevant state of a Transaction instance. The amount
+    is rounded to cents as the database stores it.
+    """
+    return (
+        instance.user_id, _as_date(instance.date), instance.transaction_type,
+        _as_decimal(instance.amount).quantize(CENT),
+    )
+
+
+def snapshot_row(row):
+    """Return the ledger-relevant state from a values() row"""
+    return (row['user_id'], _as_date(row['date']), row['transaction_type'], _as_decimal(row['amount']).quantize(CENT))
+
+
+class LedgerDelta:
+    """Accumulates count/income/expense changes per ledger bucket and count/net changes per day"""
+
+    def __init__(self):
+        self.buckets = defaultdict(lambda: [0, Decimal('0'), Decimal('0')])
+        self.days = defaultdict(lambda: [0, Decimal('0')])
+
+    def _add(self, state, sign):
+        user_id, date, transaction_type, amount = state
+        bucket = self.buckets[(user_id, date.replace(day=1), transaction_type)]
+        bucket[0] += sign
+        if amount > 0:
+            bucket[1] += sign * amount
+        elif amount < 0:
+            bucket[2] += sign * -amount
+        day = self.days[(user_id, date)]
+        day[0] += sign
+        day[1] += sign * amount
+
+    def add(self, state):
+        if state is not None:
+            self._add(state, 1)
+
+    def remove(self, state):
+        if state is not None:
+            self._add(state, -1)
+
+    def change(self, old, new):
+        if old != new:
+            self.remove(old)
+            self.add(new)
+
+    def __bool__(self):
+        # A date change within a month leaves the buckets alone but moves days
+        return any(any(values) for values in (*self.buckets.values(), *self.days.values()))
+
+    def apply(self):
+        """Write the accumulated deltas to LedgerSummary and DailyBalance"""
+        if not self:
+            return
+        with transaction.atomic():
+            for (user_id, month, transaction_type), (count, income, expenses) in self.buckets.items():
+                if not (count or income or expenses):
+                    continue
+                _apply_bucket(user_id, month, transaction_type, count, income, expenses)
+            days = defaultdict(list)
+            for (user_id, date), (count, net) in sorted(self.days.items()):
+                if count or net:
+                    days[user_id].append((date, count, net))
+            _lock_users(sorted(days))
+            for user_id, changes in days.items():
+                for start in range(0, len(changes), DAY_CHUNK_SIZE):
+                    _apply_days(user_id, changes[start:start + DAY_CHUNK_SIZE])
+
+
+def _apply_bucket(user_id, month, transaction_type, count, income, expenses):
+    from .models import LedgerSummary
+
+    lookup = {'user_id': user_id, 'month': month, 'transaction_type': transaction_type}
+    changes = {
+        'count': F('count') + count,
+        'income': F('income') + income,
+        'expenses': F('expenses') + expenses,
+    }
+    if not LedgerSummary.objects.filter(**lookup).update(**changes):
+        try:
+            with transaction.atomic():
+                LedgerSummary.objects.create(**lookup, count=count, income=income, expenses=expenses)
+        except IntegrityError:
+            # Another writer created the bucket first
+            LedgerSummary.objects.filter(**lookup).update(**changes)
+    if count < 0:
+        # Drop emptied buckets; a negative count is drift and is left for
+        # verify_ledger_summary to report
+        LedgerSummary.objects.filter(**lookup, count=0).delete()
+
+
+def _lock_users(user_ids):
+    """
+    Serialize balance maintenance per user: a new day's balance is computed
+    from the rows before it, which a concurrent writer may be shifting.
+    A no-op on SQLite, where writers are serialized anyway.
+    """
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    if user_ids and connection.features.has_select_for_update:
+        list(User.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values_list('pk', flat=True))
+
+
+def _apply_days(user_id, changes):
+    """
+    Apply a user's (date, count, net) changes, sorted by date, to DailyBalance.
+
+    Every row on or after the earliest changed day moves by the sum of the
+    nets up to its date, so one UPDATE with a CASE over the date ranges
+    shifts all of them however many days changed. Days without a row are
+    then inserted at their old balance plus that shift.
+    """
+    from .models import DailyBalance
+
+    balances = DailyBalance.objects.filter(user_id=user_id)
+    first, last = changes[0][0], changes[-1][0]
+    opening = balances.filter(date__lt=first).order_by('-date').values_list('balance', flat=True).first()
+    existing = dict(balances.filter(date__gte=first, date__lte=last).values_list('date', 'balance'))
+
+    shifts = []
+    total = Decimal('0')
+    for date, count, net in changes:
+        if net:
+            total += net
+            shifts.append((date, total))
+    counts = [When(date=date, then=F('count') + count) for date, count, net in changes if date in existing and count]
+    nets = [When(date=date, then=F('net') + Value(net)) for date, count, net in changes if date in existing and net]
+    updates = {}
+    if shifts:
+        # Latest shift first: a row takes the running total of the last changed day on or before it
+        updates['balance'] = F('balance') + Case(
+            *(When(date__gte=date, then=Value(shift)) for date, shift in reversed(shifts)),
+            default=Value(Decimal('0')), output_field=DecimalField(),
+        )
+    if counts:
+        updates['count'] = Case(*counts, default=F('count'), output_field=IntegerField())
+    if nets:
+        updates['net'] = Case(*nets, default=F('net'), output_field=DecimalField())
+    if updates:
+        balances.filter(date__gte=first).update(**updates)
+
+    created = []
+    dates = sorted(existing)
+    shift = Decimal('0')
+    for date, count, net in changes:
+        shift += net
+        if date in existing:
+            continue
+        # The old balance on a day without a row is that of the last row before it
+        index = bisect_left(dates, date)
+        previous = existing[dates[index - 1]] if index else opening or Decimal('0')
+        # _lock_users keeps other writers from creating the day meanwhile
+        created.append(DailyBalance(user_id=user_id, date=date, count=count, net=net, balance=previous + shift))
+    DailyBalance.objects.bulk_create(created)
+    if any(count < 0 for _, count, _ in changes):
+        # A day left without transactions adds nothing to the balances after
+        # it; a negative count is drift and is left for verify_daily_balances
+        balances.filter(date__gte=first, date__lte=last, count=0).delete()
+
+
+def summary_values(queryset):
+    """Return the lazy values() queryset of non-empty LedgerSummary buckets"""
+    return queryset.filter(count__gt=0).values('transaction_type', 'month', 'count', 'income', 'expenses')
+
+
+def summary_row(row):
+    """Convert a summary_values() row to the shape expected by stats.build_stats"""
+    return {
+        'transaction_type': row['transaction_type'],
+        'month': row['month'],
+        'count': row['count'],
+        'income': row['income'],
+        'expenses': -row['expenses'],
+    }
+
+
+def summary_rows(queryset):
+    """Return LedgerSummary rows in the shape expected by stats.build_stats"""
+    return [summary_row(row) for row in summary_values(queryset)]
+
+
+def _raw_buckets(user_ids=None):
+    from django.db.models import Count, Q, Sum
+    from django.db.models.functions import TruncMonth
+    from .models import Transaction
+
+    queryset = Transaction.objects.order_by()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    rows = queryset.annotate(month=TruncMonth('date')).values('user_id', 'month', 'transaction_type').annotate(
+        count=Count('id'),
+        income=Sum('amount', filter=Q(amount__gt=0), default=0),
+        expenses=Sum('amount', filter=Q(amount__lt=0), default=0),
+    )
+    return {
+        (row['user_id'], row['month'], row['transaction_type']): (row['count'], row['income'], -row['expenses'])
+        for row in rows
+    }
+
+
+def rebuild_ledger_summary(user_ids=None):
+    """Recompute LedgerSummary from the raw Transaction rows"""
+    from .models import LedgerSummary
+
+    with transaction.atomic():
+        existing = LedgerSummary.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+        buckets = _raw_buckets(user_ids)
+        LedgerSummary.objects.bulk_create([
+            LedgerSummary(user_id=user_id, month=month, transaction_type=transaction_type,
+                          count=count, income=income, expenses=expenses)
+            for (user_id, month, transaction_type), (count, income, expenses) in buckets.items()
+        ], batch_size=1000)
+    return len(buckets)
+
+
+def verify_ledger_summary(user_ids=None):
+    """
+    Compare LedgerSummary with the raw Transaction rows.
+
+    Returns a list of (key, expected, actual) tuples for every bucket that
+    differs; an empty list means the summary is consistent.
+    """
+    from .models import LedgerSummary
+
+    expected = _raw_buckets(user_ids)
+    summaries = LedgerSummary.objects.all()
+    if user_ids is not None:
+        summaries = summaries.filter(user_id__in=user_ids)
+    actual = {
+        (row['user_id'], row['month'], row['transaction_type']): (row['count'], row['income'], row['expenses'])
+        for row in summaries.values('user_id', 'month', 'transaction_type', 'count', 'income', 'expenses')
+    }
+    return [
+        (key, expected.get(key), actual.get(key))
+        for key in sorted(set(expected) | set(actual), key=str)
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+def _raw_days(user_ids=None):
+    """Per-user, per-day (count, net, balance) computed from the raw Transaction rows"""
+    from django.db.models import Count, Sum
+    from .models import Transaction
+
+    queryset = Transaction.objects.order_by()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+    rows = queryset.values('user_id', 'date').annotate(count=Count('id'), net=Sum('amount')).order_by('user_id', 'date')
+    days = {}
+    balance = Decimal('0')
+    current_user = None
+    for row in rows:
+        if row['user_id'] != current_user:
+            current_user, balance = row['user_id'], Decimal('0')
+        # SQLite sums decimals as floats; amounts are whole cents
+        net = _as_decimal(row['net']).quantize(CENT)
+        balance += net
+        days[(row['user_id'], _as_date(row['date']))] = (row['count'], net, balance)
+    return days
+
+
+def rebuild_daily_balances(user_ids=None):
+    """Recompute DailyBalance from the raw Transaction rows"""
+    from .models import DailyBalance
+
+    with transaction.atomic():
+        existing = DailyBalance.objects.all()
+        if user_ids is not None:
+            existing = existing.filter(user_id__in=user_ids)
+        existing.delete()
+        days = _raw_days(user_ids)
+        DailyBalance.objects.bulk_create([
+            DailyBalance(user_id=user_id, date=date, count=count, net=net, balance=balance)
+            for (user_id, date), (count, net, balance) in days.items()
+        ], batch_size=1000)
+    return len(days)
+
+
+def verify_daily_balances(user_ids=None):
+    """
+    Compare DailyBalance with the raw Transaction rows.
+
+    Returns (key, expected, actual) tuples like verify_ledger_summary.
+    """
+    from .models import DailyBalance
+
+    expected = _raw_days(user_ids)
+    balances = DailyBalance.objects.all()
+    if user_ids is not None:
+        balances = balances.filter(user_id__in=user_ids)
+    actual = {
+        (row['user_id'], row['date']): (row['count'], row['net'], row['balance'])
+        for row in balances.values('user_id', 'date', 'count', 'net', 'balance')
+    }
+    return [
+        (key, expected.get(key), actual.get(key))
+        for key in sorted(set(expected) | set(actual), key=str)
+        if expected.get(key) != actual.get(key)
+    ]
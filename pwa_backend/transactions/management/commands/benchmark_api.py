@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.authentication import issue_access_token
+from transactions.models import Transaction
+from transactions.synthetic import create_transactions, create_users
+from transactions.utils import open_many, seal_many
+
+SCENARIOS = (
+    'encrypt', 'decrypt', 'list', 'list_page', 'detail', 'stats', 'stats_month', 'create', 'register', 'login',
+)
+# Scenarios dominated by password hashing, run with --auth-iterations
+AUTH_SCENARIOS = ('register', 'login')
+RESULT_FIELDS = (
+    'scenario', 'rows', 'iterations', 'mean_ms', 'p50_ms', 'p95_ms', 'min_ms', 'max_ms', 'queries',
+)
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark list, detail, stats, create, register/login and encrypt/decrypt against '
+        'synthetic ledgers of several sizes and write machine-readable results'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000', help='Comma separated ledger sizes')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated scenarios')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed runs per scenario')
+        parser.add_argument('--auth-iterations', type=int, default=3, help='Timed runs for register/login')
+        parser.add_argument('--format', choices=('json', 'jsonl', 'csv'), default='json')
+        parser.add_argument('--output', help='Write results to this file instead of stdout')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers')
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(sorted(unknown))}')
+
+        results = []
+        # Measure the work itself, not the per-user response cache
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            for size in sizes:
+                results.extend(self.run_size(size, scenarios, options))
+        self.write(results, options)
+
+    def run_size(self, size, scenarios, options):
+        prefix = f'bench{uuid.uuid4().hex[:8]}-'
+        self.stderr.write(f'Seeding {size} transaction(s)...')
+        user = create_users(1, prefix=prefix, password=PASSWORD)[0]
+        create_transactions([user], size, seed=options['seed'])
+
+        client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {issue_access_token(user)}')
+        anonymous = Client(HTTP_HOST='localhost')
+        pks = list(Transaction.objects.filter(user=user).values_list('pk', flat=True))
+        rng = random.Random(options['seed'])
+        plaintexts = [f'Benchmark transaction {i}' for i in range(size)]
+        ciphertexts = seal_many(plaintexts, 'title') if 'decrypt' in scenarios else []
+
+        def ok(response, expected=200):
+            if response.status_code != expected:
+                raise CommandError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+
+        def encrypt(i):
+            seal_many(plaintexts, 'title')
+
+        def decrypt(i):
+            open_many(ciphertexts, 'title')
+
+        runners = {
+            'encrypt': encrypt,
+            'decrypt': decrypt,
+            'list': lambda i: ok(client.get('/api/transactions/')),
+            'list_page': lambda i: ok(client.get('/api/transactions/?page_size=50')),
+            'detail': lambda i: ok(client.get(f'/api/transactions/{rng.choice(pks)}/')),
+            'stats': lambda i: ok(client.get('/api/transactions/stats/')),
+            'stats_month': lambda i: ok(client.get('/api/transactions/stats/?group_by=month')),
+            'create': lambda i: ok(client.post('/api/transactions/', {
+                'title': f'Benchmark {i}', 'amount': '-12.50', 'transaction_type': 'other',
+                'date': timezone.localdate().isoformat(),
+            }, content_type='application/json'), 201),
+            'register': lambda i: ok(anonymous.post('/api/auth/register/', {
+                'name': f'Benchmark {i}', 'email': f'{prefix}reg{i}@example.com', 'password': PASSWORD,
+                'confirm_password': PASSWORD, 'account_number': '000000', 'ifsc_code': 'BENCH0000',
+            }, content_type='application/json'), 201),
+            'login': lambda i: ok(anonymous.post('/api/accounts/login/', {
+                'email': user.email, 'password': PASSWORD,
+            }, content_type='application/json')),
+        }
+
+        results = []
+        try:
+            for scenario in scenarios:
+                iterations = options['auth_iterations'] if scenario in AUTH_SCENARIOS else options['iterations']
+                self.stderr.write(f'  {scenario} x{iterations}')
+                results.append(self.measure(scenario, size, runners[scenario], iterations))
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+        return results
+
+    def measure(self, scenario, rows, runner, iterations):
+        durations = []
+        queries = []
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                runner(i)
+                durations.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+        durations.sort()
+        return {
+            'scenario': scenario,
+            'rows': rows,
+            'iterations': iterations,
+            'mean_ms': round(statistics.fmean(durations), 3),
+            'p50_ms': round(statistics.median(durations), 3),
+            'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+            'min_ms': round(durations[0], 3),
+            'max_ms': round(durations[-1], 3),
+            'queries': round(statistics.fmean(queries), 1),
+        }
+
+    def write(self, results, options):
+        buffer = io.StringIO()
+        if options['format'] == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+        elif options['format'] == 'jsonl':
+            for result in results:
+                buffer.write(json.dumps(result) + '\n')
+        else:
+            json.dump({
+                'generated_at': timezone.now().isoformat(),
+                'python': sys.version.split()[0],
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'database': connection.vendor,
+                'results': results,
+            }, buffer, indent=2)
+            buffer.write('\n')
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.write(buffer.getvalue())
+        else:
+            self.stdout.write(buffer.getvalue(), ending='')
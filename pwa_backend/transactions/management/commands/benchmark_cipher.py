@@ -0,0 +1,39 @@
+import time
+
+from cryptography.fernet import Fernet
+from django.core.management.base import BaseCommand
+
+from transactions.utils import cipher_engine, decrypt_data, encrypt_data, get_encryption_key
+
+
+class Command(BaseCommand):
+    help = 'Compare per-row encrypt/decrypt cost with per-call key derivation vs the cached cipher engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Number of rows to simulate')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        titles = [f'Transaction title {i}' for i in range(rows)]
+
+        # Before: derive the key and build a Fernet on every call
+        start = time.perf_counter()
+        tokens = [Fernet(get_encryption_key()).encrypt(t.encode()) for t in titles]
+        for token in tokens:
+            Fernet(get_encryption_key()).decrypt(token)
+        uncached = time.perf_counter() - start
+
+        # After: shared cipher engine, key derived once per process
+        cipher_engine.reset()
+        start = time.perf_counter()
+        tokens = [encrypt_data(t) for t in titles]
+        for token in tokens:
+            decrypt_data(token)
+        cached = time.perf_counter() - start
+
+        per_row_before = uncached / rows * 1000
+        per_row_after = cached / rows * 1000
+        self.stdout.write(f'Rows: {rows} (encrypt + decrypt per row)')
+        self.stdout.write(f'Per-call key derivation: {per_row_before:.3f} ms/row')
+        self.stdout.write(f'Cached cipher engine:    {per_row_after:.3f} ms/row')
+        self.stdout.write(self.style.SUCCESS(f'Speedup: {per_row_before / per_row_after:.1f}x'))
@@ -0,0 +1,88 @@
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from transactions.models import Transaction
+from transactions.synthetic import create_users, iter_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure transaction write throughput with N parallel writers, each on its own '
+        'database connection, through save() (like perform_create) or bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', default='1,2,4,8', help='Comma separated writer counts to run')
+        parser.add_argument('--rows', type=int, default=200, help='Rows written by each writer')
+        parser.add_argument('--mode', choices=('save', 'bulk'), default='save')
+        parser.add_argument('--batch-size', type=int, default=50, help='Rows per bulk_create in bulk mode')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            writer_counts = [int(count) for count in options['writers'].split(',') if count.strip()]
+        except ValueError:
+            raise CommandError('--writers must be a comma separated list of integers')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('Parallel writers need a file or server database, not an in-memory SQLite one')
+
+        settings_dict = connection.settings_dict
+        self.stdout.write(f'Database: {connection.vendor} {settings_dict["NAME"]}')
+        for pragma, value in settings_dict.get('PRAGMAS', {}).items():
+            self.stdout.write(f'  {pragma} = {value}')
+        if 'TRANSACTION_MODE' in settings_dict:
+            self.stdout.write(f'  transactions: BEGIN {settings_dict["TRANSACTION_MODE"]}')
+        self.stdout.write(f'Mode: {options["mode"]}, {options["rows"]} row(s) per writer\n')
+        self.stdout.write(f'{"writers":>8} {"rows":>8} {"seconds":>9} {"rows/s":>9} {"errors":>7}')
+
+        prefix = f'dbbench{uuid.uuid4().hex[:8]}-'
+        try:
+            for writers in writer_counts:
+                self.run(prefix, writers, options)
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def run(self, prefix, writers, options):
+        users = create_users(writers, prefix=f'{prefix}{writers}w')
+        start_barrier = threading.Barrier(writers)
+
+        def write(user):
+            rng = random.Random(options['seed'] + user.pk)
+            rows = list(iter_transactions(user, options['rows'], rng))
+            written = errors = 0
+            start_barrier.wait()
+            try:
+                if options['mode'] == 'bulk':
+                    for i in range(0, len(rows), options['batch_size']):
+                        batch = rows[i:i + options['batch_size']]
+                        try:
+                            Transaction.objects.bulk_create(batch)
+                            written += len(batch)
+                        except OperationalError:
+                            errors += 1
+                else:
+                    for row in rows:
+                        try:
+                            row.save()
+                            written += 1
+                        except OperationalError:
+                            errors += 1
+            finally:
+                connections.close_all()
+            return written, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            results = list(pool.map(write, users))
+        elapsed = time.perf_counter() - start
+
+        written = sum(result[0] for result in results)
+        errors = sum(result[1] for result in results)
+        self.stdout.write(f'{writers:>8} {written:>8} {elapsed:>9.2f} {written / elapsed:>9.1f} {errors:>7}')
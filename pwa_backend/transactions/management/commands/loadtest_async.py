@@ -0,0 +1,95 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from transactions.models import Transaction
+
+ENDPOINTS = (
+    'transactions/?page_size=50',
+    'transactions/stats/',
+    'transactions/stats/?group_by=month',
+    'user/profile/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare read throughput of the sync (WSGI) API views with their async (ASGI) '
+        'variants under concurrent requests, using the in-process test clients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Transactions in the test ledger')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(f'loadtest-{uuid.uuid4().hex[:12]}', password=uuid.uuid4().hex)
+        try:
+            self.seed(user, options['rows'])
+            token = str(RefreshToken.for_user(user).access_token)
+            # The response cache would turn every sync request after the first into a cache hit
+            with override_settings(RESPONSE_CACHE_ENABLED=False):
+                self.run_comparison(token, options)
+        finally:
+            user.delete()
+
+    def seed(self, user, rows):
+        today = date.today()
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                title=f'Load test transaction {i}',
+                description='Generated by loadtest_async',
+                amount=Decimal(i % 500) - Decimal('250.00'),
+                transaction_type='other',
+                date=today - timedelta(days=i % 365),
+            )
+            for i in range(rows)
+        ])
+
+    def run_comparison(self, token, options):
+        total = options['requests']
+        concurrency = options['concurrency']
+        self.stdout.write(f'{total} requests per endpoint, concurrency {concurrency}')
+        self.stdout.write(f'{"endpoint":<40} {"wsgi req/s":>12} {"asgi req/s":>12}')
+        for endpoint in ENDPOINTS:
+            wsgi = self.run_sync(f'/api/{endpoint}', token, total, concurrency)
+            asgi = asyncio.run(self.run_async(f'/api/async/{endpoint}', token, total, concurrency))
+            self.stdout.write(f'{endpoint:<40} {total / wsgi:>12.1f} {total / asgi:>12.1f}')
+
+    def run_sync(self, path, token, total, concurrency):
+        def worker(count):
+            client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+            for _ in range(count):
+                assert client.get(path).status_code == 200
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, self.split(total, concurrency)))
+        return time.perf_counter() - start
+
+    async def run_async(self, path, token, total, concurrency):
+        client = AsyncClient(server=('localhost', '80'))
+        headers = {'authorization': f'Bearer {token}'}
+
+        async def worker(count):
+            for _ in range(count):
+                response = await client.get(path, headers=headers)
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(count) for count in self.split(total, concurrency)))
+        return time.perf_counter() - start
+
+    @staticmethod
+    def split(total, parts):
+        return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
@@ -0,0 +1,109 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import UsernameSequence
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = (
+        'Register thousands of users sharing one email local part concurrently through '
+        '/api/auth/register/ and check that usernames stay unique and queries stay constant'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--real-hashing', action='store_true',
+                            help='Keep the configured password hasher (much slower)')
+        parser.add_argument('--keep', action='store_true', help='Do not delete the created users')
+
+    def handle(self, *args, **options):
+        local_part = f'load{uuid.uuid4().hex[:8]}'
+        overrides = {'RESPONSE_CACHE_ENABLED': False}
+        if not options['real_hashing']:
+            overrides['PASSWORD_HASHERS'] = FAST_HASHERS
+
+        try:
+            with override_settings(**overrides):
+                self.run(local_part, options['signups'], options['concurrency'])
+        finally:
+            if not options['keep']:
+                User.objects.filter(username__startswith=local_part).delete()
+                UsernameSequence.objects.filter(base=local_part).delete()
+
+    def register(self, client, local_part, i):
+        return client.post('/api/auth/register/', {
+            'name': f'Load test {i}', 'email': f'{local_part}@host{i}.test',
+            'password': 'loadtest-password', 'confirm_password': 'loadtest-password',
+            'account_number': '000000', 'ifsc_code': 'LOAD0000',
+        }, content_type='application/json')
+
+    def probe(self, local_part, i):
+        """Query count of one signup, measured in this thread"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.register(Client(HTTP_HOST='localhost', raise_request_exception=False), local_part, i)
+        if response.status_code != 201:
+            raise CommandError(f'Probe signup failed with {response.status_code}: {response.content[:200]}')
+        return len(captured)
+
+    def run(self, local_part, signups, concurrency):
+        # The first signup for a base also creates its sequence row
+        self.probe(local_part, 0)
+        first_queries = self.probe(local_part, -1)
+
+        def worker(indexes):
+            # Turn server errors into 500 responses instead of raising them here
+            client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+            statuses = Counter()
+            conflicts = 0
+            for i in indexes:
+                response = self.register(client, local_part, i)
+                statuses[response.status_code] += 1
+                exc_info = getattr(response, 'exc_info', None)
+                if response.status_code in (409, 500) or (exc_info and issubclass(exc_info[0], IntegrityError)):
+                    conflicts += 1
+            return statuses, conflicts
+
+        batches = [range(1 + offset, signups + 1, concurrency) for offset in range(concurrency)]
+        start = time.perf_counter()
+        statuses = Counter()
+        conflicts = 0
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for batch_statuses, batch_conflicts in pool.map(worker, batches):
+                statuses += batch_statuses
+                conflicts += batch_conflicts
+        elapsed = time.perf_counter() - start
+
+        last_queries = self.probe(local_part, signups + 1)
+        # The unique constraint keeps duplicate usernames out of the table, so
+        # a clash in the allocator shows up as a failed signup instead
+        created = User.objects.filter(username__startswith=local_part).count()
+        # Registration retries a taken username with the next suffix, so a
+        # clash that was absorbed by a retry leaves an unused suffix behind
+        allocated = UsernameSequence.objects.filter(base=local_part).values_list('last', flat=True).get() + 1
+        retries = allocated - created
+
+        self.stdout.write(f'Base username:        {local_part}')
+        self.stdout.write(f'Signups:              {signups} with concurrency {concurrency} in {elapsed:.1f}s '
+                          f'({signups / elapsed:.1f}/s)')
+        self.stdout.write(f'Responses:            {dict(sorted(statuses.items()))}')
+        self.stdout.write(f'Users created:        {created}')
+        self.stdout.write(f'Username conflicts:   {conflicts} (409/500 responses or IntegrityError), '
+                          f'{retries} absorbed by a retry')
+        self.stdout.write(f'Queries per signup:   {first_queries} early, {last_queries} after {signups} collisions')
+
+        if conflicts or retries or statuses[201] + 3 != created:
+            raise CommandError('Username allocation produced conflicting signups or lost users')
+        if last_queries != first_queries:
+            raise CommandError('Signup query count changed with the number of same-prefix users')
+        self.stdout.write(self.style.SUCCESS('Username allocation is unique and constant-query'))
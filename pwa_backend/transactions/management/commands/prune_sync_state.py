@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from transactions.sync import prune_sync_state
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones and idempotency records older than SYNC_TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        tombstones, operations = prune_sync_state()
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {tombstones} tombstone(s) and {operations} sync operation(s)'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.ledger import (
+    rebuild_daily_balances, rebuild_ledger_summary, verify_daily_balances, verify_ledger_summary,
+)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the LedgerSummary and DailyBalance tables from raw transactions, or verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Only compare, do not rewrite')
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limit to a user id (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = options['users']
+
+        if options['verify']:
+            mismatches = verify_ledger_summary(user_ids)
+            day_mismatches = verify_daily_balances(user_ids)
+            for key, expected, actual in mismatches + day_mismatches:
+                self.stdout.write(f'{key}: expected {expected}, found {actual}')
+            if mismatches or day_mismatches:
+                raise CommandError(
+                    f'{len(mismatches)} ledger bucket(s) and {len(day_mismatches)} daily balance(s) out of date'
+                )
+            self.stdout.write(self.style.SUCCESS('Ledger summary and daily balances are consistent'))
+            return
+
+        buckets = rebuild_ledger_summary(user_ids)
+        days = rebuild_daily_balances(user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} ledger bucket(s) and {days} daily balance(s)'))
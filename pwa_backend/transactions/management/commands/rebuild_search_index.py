@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from transactions.models import Transaction
+from transactions.search import reindex_transactions
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the blind search index (run after setting or changing SEARCH_INDEX_KEY)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(Transaction.objects.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            Transaction.decrypt_batch(batch)
+            for instance in batch:
+                instance.title = instance.decrypted_title
+                instance.description = instance.decrypted_description
+            reindex_transactions(batch)
+            total += len(batch)
+            last_id = batch[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {total} transaction(s)'))
@@ -0,0 +1,127 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from transactions.models import KeyRotationCheckpoint, Transaction
+from transactions.search import reindex_transactions
+from transactions.utils import key_id, open_stored, reseal
+
+
+COLUMNS = ('pk', '_sealed_title', '_sealed_description', '_encrypted_title', '_encrypted_description')
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encrypt transaction fields as envelopes under ENCRYPTION_KEY in primary-key ordered batches, '
+        'checkpointing after each batch so an interrupted run resumes where it stopped'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows re-encrypted per database transaction')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to pause between batches')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches (resume later)')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first row')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'ENCRYPTION_OLD_KEYS', None):
+            raise CommandError('ENCRYPTION_OLD_KEYS is empty: add the previous key there before rotating')
+
+        checkpoint, _ = KeyRotationCheckpoint.objects.get_or_create(key_id=key_id())
+        if options['restart']:
+            checkpoint.last_id = checkpoint.rotated = 0
+            checkpoint.completed_at = None
+            checkpoint.save()
+        elif checkpoint.completed_at:
+            self.stdout.write(self.style.SUCCESS(f'Rotation to key {checkpoint.key_id} already completed'))
+            return
+        elif checkpoint.last_id:
+            self.stdout.write(f'Resuming after transaction {checkpoint.last_id} ({checkpoint.rotated} rotated)')
+
+        batches = 0
+        skipped = undecryptable = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            rows = list(
+                Transaction.objects.filter(pk__gt=checkpoint.last_id).order_by('pk')
+                .values_list(*COLUMNS)[:options['batch_size']]
+            )
+            if not rows:
+                checkpoint.completed_at = timezone.now()
+                checkpoint.save(update_fields=['completed_at', 'updated_at'])
+                break
+
+            _, changed, failed = self.rotate_batch(rows, checkpoint)
+            skipped += changed
+            undecryptable += failed
+            batches += 1
+            self.stdout.write(f'Rotated {checkpoint.rotated} row(s), up to transaction {checkpoint.last_id}')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if skipped:
+            self.stdout.write(f'{skipped} row(s) changed during the run and were already written with the new key')
+        if undecryptable:
+            self.stderr.write(self.style.ERROR(f'{undecryptable} row(s) could not be decrypted with any configured key'))
+        if checkpoint.completed_at:
+            self.stdout.write(self.style.SUCCESS(
+                f'Rotation complete: {checkpoint.rotated} row(s) re-encrypted; '
+                'the old keys can be removed from ENCRYPTION_OLD_KEYS'
+            ))
+        else:
+            self.stdout.write(f'Stopped after {batches} batch(es); run again to resume')
+
+    def rotate_batch(self, rows, checkpoint):
+        """
+        Re-encrypt one batch, then write it and advance the checkpoint in
+        one short transaction. Legacy Fernet tokens are converted to
+        envelopes on the way.
+
+        Each row is updated only if its ciphertext is still the one that was
+        read, so a concurrent edit (already encrypted with the new key) is
+        never overwritten. The plain base manager is used on purpose: the
+        plaintext does not change, so updated_at, delta sync and the response
+        cache must not see these writes.
+
+        Unless SEARCH_INDEX_KEY pins the search index to its own key, the
+        rotated rows are reindexed under the new key in the same
+        transaction; searches match both keys until the rotation completes.
+        """
+        updates = []
+        failed = 0
+        for pk, *stored in rows:
+            plaintext = (open_stored(stored[0], stored[2], 'title'), open_stored(stored[1], stored[3], 'description'))
+            if None in plaintext:
+                failed += 1
+                continue
+            _, title = reseal(stored[0], stored[2], 'title', plaintext[0])
+            _, description = reseal(stored[1], stored[3], 'description', plaintext[1])
+            updates.append((pk, stored, title, description, plaintext))
+
+        rotated = changed = 0
+        reindex = []
+        with db_transaction.atomic():
+            for pk, stored, title, description, plaintext in updates:
+                updated = Transaction._base_manager.filter(pk=pk, **dict(zip(COLUMNS[1:], stored))).update(
+                    _sealed_title=title, _sealed_description=description,
+                    _encrypted_title=None, _encrypted_description=None,
+                )
+                rotated += updated
+                changed += 1 - updated
+                if updated:
+                    reindex.append((pk, plaintext))
+            if reindex and not getattr(settings, 'SEARCH_INDEX_KEY', None):
+                self.reindex(reindex)
+            checkpoint.last_id = rows[-1][0]
+            checkpoint.rotated += rotated
+            checkpoint.save(update_fields=['last_id', 'rotated', 'updated_at'])
+        return rotated, changed, failed
+
+    def reindex(self, rows):
+        """Rewrite the search tokens of ``(pk, (title, description))`` rows under the current key"""
+        user_ids = dict(Transaction._base_manager.filter(pk__in=[pk for pk, _ in rows]).values_list('pk', 'user_id'))
+        reindex_transactions([
+            Transaction(pk=pk, user_id=user_ids[pk], title=title, description=description)
+            for pk, (title, description) in rows
+        ])
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from transactions.synthetic import create_transactions, create_users
+
+
+class Command(BaseCommand):
+    help = 'Create N synthetic users with M encrypted transactions each'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--transactions', type=int, default=1000, help='Transactions per user')
+        parser.add_argument('--prefix', default='synthetic', help='Username prefix')
+        parser.add_argument('--password', default='synthetic-password')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for reproducible ledgers')
+        parser.add_argument('--days', type=int, default=730, help='Spread transaction dates over this many days')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users with prefix "{prefix}" already exist; pick another --prefix')
+
+        start = time.perf_counter()
+        users = create_users(options['users'], prefix=prefix, password=options['password'])
+        total = create_transactions(
+            users, options['transactions'], seed=options['seed'],
+            batch_size=options['batch_size'], days=options['days'],
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} user(s) and {total} transaction(s) in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary into the SQLite replica stand-in (DATABASE_REPLICA_URL) with the '
+        'online backup API, once or every --interval seconds to simulate replication lag'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying every N seconds until interrupted')
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE
+        if not alias:
+            raise CommandError('DATABASE_REPLICA_URL is not set')
+        primary, replica = connections['default'], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Only SQLite primaries and replicas can be copied; use real replication otherwise')
+
+        while True:
+            start = time.perf_counter()
+            self.copy(str(primary.settings_dict['NAME']), str(replica.settings_dict['NAME']))
+            self.stdout.write(f'Replica updated in {(time.perf_counter() - start) * 1000:.1f} ms')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
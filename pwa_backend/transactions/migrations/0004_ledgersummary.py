@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_ledger_summary(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    LedgerSummary = apps.get_model('transactions', 'LedgerSummary')
+    rows = Transaction.objects.order_by().annotate(month=TruncMonth('date')).values(
+        'user_id', 'month', 'transaction_type'
+    ).annotate(
+        count=Count('id'),
+        income=Sum('amount', filter=Q(amount__gt=0), default=0),
+        expenses=Sum('amount', filter=Q(amount__lt=0), default=0),
+    )
+    LedgerSummary.objects.bulk_create([
+        LedgerSummary(
+            user_id=row['user_id'], month=row['month'], transaction_type=row['transaction_type'],
+            count=row['count'], income=row['income'], expenses=-row['expenses'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0003_bankaccount_user_alter_bankaccount_password'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('transaction_type', models.CharField(choices=[('salary', 'Salary'), ('grocery', 'Grocery'), ('fees', 'Fees'), ('entertainment', 'Entertainment'), ('transport', 'Transport'), ('other', 'Other')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'month', 'transaction_type'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ledgersummary',
+            constraint=models.UniqueConstraint(fields=('user', 'month', 'transaction_type'), name='unique_ledger_bucket'),
+        ),
+        migrations.RunPython(populate_ledger_summary, migrations.RunPython.noop),
+    ]
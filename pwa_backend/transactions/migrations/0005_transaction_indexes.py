@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_ledgersummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-date', '-created_at', '-id'], name='txn_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'transaction_type', '-date'], name='txn_user_type_date_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0005_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64)),
+                ('transaction_id', models.BigIntegerField(blank=True, null=True)),
+                ('status_code', models.PositiveSmallIntegerField()),
+                ('response', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TransactionTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='transactiontombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='syncoperation',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_operations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='transactiontombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='syncoperation',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='unique_sync_operation'),
+        ),
+    ]
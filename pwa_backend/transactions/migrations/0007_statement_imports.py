@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+from transactions.utils import transaction_fingerprint
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    last_id = 0
+    while True:
+        batch = list(Transaction.objects.filter(id__gt=last_id).order_by('id')[:1000])
+        if not batch:
+            break
+        for row in batch:
+            row.fingerprint = transaction_fingerprint(row.date, row.amount, row.title)
+        Transaction.objects.bulk_update(batch, ['fingerprint'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0006_sync_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_format', models.CharField(choices=[('csv', 'CSV'), ('ofx', 'OFX')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_rows', models.IntegerField(default=0)),
+                ('imported', models.IntegerField(default=0)),
+                ('duplicates', models.IntegerField(default=0)),
+                ('failed_rows', models.IntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'fingerprint'], name='txn_user_fingerprint_idx'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from transactions.search import tokens_for_text
+
+
+def build_search_index(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    TransactionSearchToken = apps.get_model('transactions', 'TransactionSearchToken')
+    last_id = 0
+    while True:
+        batch = list(Transaction.objects.filter(id__gt=last_id).order_by('id')[:1000])
+        if not batch:
+            break
+        TransactionSearchToken.objects.bulk_create([
+            TransactionSearchToken(user_id=row.user_id, transaction_id=row.id, token=token)
+            for row in batch
+            for token in tokens_for_text(row.title, row.description)
+        ], batch_size=1000)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0007_statement_imports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='transactions.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'token'], name='search_user_token_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
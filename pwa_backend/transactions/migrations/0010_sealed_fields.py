@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_key_rotation_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='_sealed_description',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='_sealed_title',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations, transaction
+
+from transactions.utils import encrypt_data, open_data, reseal, seal_data
+
+BATCH_SIZE = 1000
+
+
+def seal_existing_rows(apps, schema_editor):
+    """
+    Convert Fernet text tokens to binary envelopes, one short transaction
+    per batch of rows. Rows written before field encryption, with neither a
+    token nor an envelope, are sealed from their plaintext columns in the
+    same pass. Converted rows have no text token left, so an interrupted
+    run picks up where it stopped. A row is only written if the values it
+    was converted from are unchanged since they were read.
+    """
+    Transaction = apps.get_model('transactions', 'Transaction')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        rows = list(
+            Transaction.objects.using(db).filter(id__gt=last_id).order_by('id')
+            .values_list(
+                'id', '_encrypted_title', '_encrypted_description', '_sealed_title', '_sealed_description',
+                'title', 'description',
+            )[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        with transaction.atomic(using=db):
+            for pk, title, description, sealed_title, sealed_description, plain_title, plain_description in rows:
+                if title or description:
+                    title_ok, sealed_title = reseal(None, title, 'title')
+                    description_ok, sealed_description = reseal(None, description, 'description')
+                    if not (title_ok and description_ok):
+                        # Leave rows no configured key can decrypt readable as they are
+                        continue
+                    unchanged = {'_encrypted_title': title, '_encrypted_description': description}
+                elif not (sealed_title or sealed_description) and (plain_title or plain_description):
+                    unchanged = {
+                        'title': plain_title, 'description': plain_description,
+                        '_encrypted_title': title, '_encrypted_description': description,
+                        '_sealed_title': sealed_title, '_sealed_description': sealed_description,
+                    }
+                    sealed_title = seal_data(plain_title, 'title')
+                    sealed_description = seal_data(plain_description, 'description')
+                else:
+                    continue
+                Transaction.objects.using(db).filter(id=pk, **unchanged).update(
+                    _sealed_title=sealed_title, _sealed_description=sealed_description,
+                    _encrypted_title=None, _encrypted_description=None,
+                )
+        last_id = rows[-1][0]
+
+
+def unseal_rows(apps, schema_editor):
+    """Write envelopes back as Fernet tokens so older code can read them"""
+    Transaction = apps.get_model('transactions', 'Transaction')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        rows = list(
+            Transaction.objects.using(db).filter(id__gt=last_id).order_by('id')
+            .values_list('id', '_sealed_title', '_sealed_description', '_encrypted_title', '_encrypted_description')
+            [:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        with transaction.atomic(using=db):
+            for pk, sealed_title, sealed_description, title, description in rows:
+                if title or description or not (sealed_title or sealed_description):
+                    continue
+                plain_title = open_data(sealed_title, 'title')
+                plain_description = open_data(sealed_description, 'description')
+                if (sealed_title and plain_title is None) or (sealed_description and plain_description is None):
+                    continue
+                Transaction.objects.using(db).filter(id=pk).update(
+                    _encrypted_title=encrypt_data(plain_title) or None,
+                    _encrypted_description=encrypt_data(plain_description) or None,
+                    _sealed_title=None, _sealed_description=None,
+                )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own instead of one transaction over the table
+    atomic = False
+
+    dependencies = [
+        ('transactions', '0010_sealed_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(seal_existing_rows, unseal_rows),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:03
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def populate_daily_balances(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    DailyBalance = apps.get_model('transactions', 'DailyBalance')
+    rows = Transaction.objects.order_by().values('user_id', 'date').annotate(
+        count=Count('id'), net=Sum('amount'),
+    ).order_by('user_id', 'date')
+    batch = []
+    current_user, balance = None, 0
+    for row in rows.iterator():
+        if row['user_id'] != current_user:
+            current_user, balance = row['user_id'], 0
+        # SQLite sums decimals as floats; amounts are whole cents
+        net = Decimal(str(row['net'])).quantize(Decimal('0.01'))
+        balance += net
+        batch.append(DailyBalance(
+            user_id=row['user_id'], date=row['date'], count=row['count'], net=net, balance=balance,
+        ))
+        if len(batch) >= 1000:
+            DailyBalance.objects.bulk_create(batch)
+            batch = []
+    DailyBalance.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transactions', '0011_seal_existing_rows'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailybalance',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_daily_balance'),
+        ),
+        migrations.RunPython(populate_daily_balances, migrations.RunPython.noop),
+    ]
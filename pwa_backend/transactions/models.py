@@ -1,9 +1,101 @@
-from django.db import models
+import uuid
+
+from django.db import models, router
 from django.contrib.auth.models import User
 from django.conf import settings
-from .utils import encrypt_data, decrypt_data
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from .cache import invalidate_ledgers
+from .ledger import (
+    LedgerDelta, TRACKED_FIELDS, rebuild_daily_balances, rebuild_ledger_summary, snapshot, snapshot_row,
+)
+from .search import reindex_transactions
+from .utils import decrypt_data, decrypt_many, open_data, open_many, seal_many, transaction_fingerprint
+
+
+class TransactionQuerySet(models.QuerySet):
+    """
+    Keeps LedgerSummary, updated_at, delete tombstones and the response
+    cache version in step with bulk writes that bypass save()
+    """
+
+    def _ledger_rows(self):
+        # Locked so a concurrent update or delete of the same rows waits and
+        # then sees their current state
+        return self.order_by().select_for_update().values('pk', *TRACKED_FIELDS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        self.model.prepare_batch(objs)
+        with db_transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            invalidate_ledgers({obj.user_id for obj in objs}, using=self.db)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Cannot tell which rows were written; recount affected users
+                rebuild_ledger_summary({obj.user_id for obj in objs})
+                rebuild_daily_balances({obj.user_id for obj in objs})
+                reindex_transactions(created)
+                return created
+            delta = LedgerDelta()
+            for obj in created:
+                delta.add(snapshot(obj))
+            delta.apply()
+            reindex_transactions(created)
+        return created
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # The ledger deltas are applied by update(), which bulk_update uses
+        objs = list(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = [*fields, 'updated_at'] if 'updated_at' not in fields else list(fields)
+        if set(self.model.SOURCE_FIELDS) & set(fields):
+            self.model.prepare_batch(objs)
+            fields += [f for f in self.model.DERIVED_FIELDS if f not in fields]
+        with db_transaction.atomic(using=self.db):
+            updated = super().bulk_update(objs, fields, *args, **kwargs)
+            invalidate_ledgers({obj.user_id for obj in objs}, using=self.db)
+            if {'title', 'description'} & set(fields):
+                reindex_transactions(objs)
+        return updated
+
+    def update(self, **kwargs):
+        # auto_now is not applied by queryset updates; delta sync relies on it
+        kwargs.setdefault('updated_at', timezone.now())
+        tracked = {'user_id' if f == 'user' else f for f in kwargs} & set(TRACKED_FIELDS)
+        with db_transaction.atomic(using=self.db):
+            if not tracked:
+                invalidate_ledgers(set(self.order_by().values_list('user_id', flat=True).distinct()), using=self.db)
+                return super().update(**kwargs)
+            old = {row['pk']: snapshot_row(row) for row in self._ledger_rows()}
+            updated = super().update(**kwargs)
+            delta = LedgerDelta()
+            new_rows = list(self.model._default_manager.filter(pk__in=list(old))._ledger_rows())
+            for row in new_rows:
+                delta.change(old[row['pk']], snapshot_row(row))
+            delta.apply()
+            invalidate_ledgers({state[0] for state in old.values()} | {row['user_id'] for row in new_rows}, using=self.db)
+        return updated
+
+    update.alters_data = True
+
+    def delete(self):
+        with db_transaction.atomic(using=self.db):
+            delta = LedgerDelta()
+            rows = list(self._ledger_rows())
+            for row in rows:
+                delta.remove(snapshot_row(row))
+            deleted = super().delete()
+            delta.apply()
+            invalidate_ledgers({row['user_id'] for row in rows}, using=self.db)
+            TransactionTombstone.objects.bulk_create([
+                TransactionTombstone(user_id=row['user_id'], transaction_id=row['pk']) for row in rows
+            ])
+        return deleted
 
-from django.db import models
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Transaction(models.Model):
@@ -25,40 +117,335 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    # Encrypted fields
+    # Encrypted fields: binary envelopes (see utils.Envelope). The legacy
+    # Fernet text tokens are cleared on every write, so when one is present
+    # it was written after the envelope (by a server still running older
+    # code) and takes precedence.
+    _sealed_title = models.BinaryField(blank=True, null=True)
+    _sealed_description = models.BinaryField(blank=True, null=True)
     _encrypted_title = models.TextField(blank=True, null=True)
     _encrypted_description = models.TextField(blank=True, null=True)
     
+    # Keyed hash of date/amount/title for duplicate detection on import
+    fingerprint = models.CharField(max_length=32, blank=True, default='', editable=False)
+    
+    # Columns computed from the plaintext fields by prepare_batch()
+    DERIVED_FIELDS = (
+        '_sealed_title', '_sealed_description', '_encrypted_title', '_encrypted_description', 'fingerprint',
+    )
+    SOURCE_FIELDS = ('title', 'description', 'date', 'amount')
+    
+    objects = TransactionQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Default listing and keyset pagination: user + ordering (+ id tiebreak)
+            models.Index(fields=['user', '-date', '-created_at', '-id'], name='txn_user_date_idx'),
+            # Type-filtered listings and per-type stats
+            models.Index(fields=['user', 'transaction_type', '-date'], name='txn_user_type_date_idx'),
+            # Delta sync: rows changed since a token
+            models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
+            # Import deduplication
+            models.Index(fields=['user', 'fingerprint'], name='txn_user_fingerprint_idx'),
+        ]
+    
+    def _locked_ledger_state(self, using=None):
+        """
+        The stored ledger state of this row, read with a row lock inside the
+        caller's transaction. The instance's own values may be stale: another
+        request can have changed or deleted the row since it was loaded.
+        """
+        row = (
+            Transaction._base_manager.using(using or router.db_for_write(Transaction, instance=self))
+            .select_for_update().filter(pk=self.pk).values(*TRACKED_FIELDS).first()
+        )
+        return snapshot_row(row) if row else None
     
     def save(self, *args, **kwargs):
+        using = kwargs.get('using')
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and self.pk and not self._state.adding and self.get_deferred_fields():
+            # Django only writes the loaded fields of a deferred instance
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                f.attname for f in self._meta.concrete_fields if not f.primary_key and f.attname not in deferred
+            ]
+        written = None
+        if update_fields is not None:
+            written = {'user_id' if f == 'user' else f for f in update_fields}
+            # Keep the ciphertext, fingerprint and delta sync in step with
+            # the plaintext columns being written
+            extra = ['updated_at']
+            if written & set(self.SOURCE_FIELDS):
+                extra += self.DERIVED_FIELDS
+            kwargs['update_fields'] = [*update_fields, *(f for f in extra if f not in written)]
+        
         # Encrypt sensitive data before saving
-        if self.title:
-            self._encrypted_title = encrypt_data(self.title)
-        if self.description:
-            self._encrypted_description = encrypt_data(self.description)
-        super().save(*args, **kwargs)
+        if written is None or written & set(self.SOURCE_FIELDS):
+            self.prepare_batch([self])
+        
+        with db_transaction.atomic(using=using):
+            old_state = self._locked_ledger_state(using) if self.pk else None
+            super().save(*args, **kwargs)
+            if written is None or written & {'title', 'description'}:
+                reindex_transactions([self])
+            new_state = old_state
+            if written is None or old_state is None:
+                new_state = snapshot(self)
+            elif written & set(TRACKED_FIELDS):
+                new_state = snapshot_row({
+                    field: getattr(self, field) if field in written else value
+                    for field, value in zip(TRACKED_FIELDS, old_state)
+                })
+            delta = LedgerDelta()
+            delta.change(old_state, new_state)
+            delta.apply()
+            invalidate_ledgers({self.user_id, old_state and old_state[0]}, using=using)
+    
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using')
+        with db_transaction.atomic(using=using):
+            pk = self.pk
+            old_state = self._locked_ledger_state(using)
+            deleted = super().delete(*args, **kwargs)
+            # A concurrent delete may have removed the row already
+            if deleted[1].get(self._meta.label):
+                delta = LedgerDelta()
+                delta.remove(old_state)
+                delta.apply()
+                invalidate_ledgers({old_state[0]}, using=using)
+                TransactionTombstone.objects.create(user_id=old_state[0], transaction_id=pk)
+        return deleted
+    
+    def _decrypt_field(self, field):
+        plaintext = getattr(self, '_plaintext', None)
+        if plaintext is not None:
+            return plaintext[field]
+        value = None
+        token = getattr(self, f'_encrypted_{field}')
+        sealed = getattr(self, f'_sealed_{field}')
+        if token:
+            value = decrypt_data(token)
+        elif sealed:
+            value = open_data(sealed, field)
+        return getattr(self, field) if value is None else value
     
     @property
     def decrypted_title(self):
         """Return decrypted title"""
-        if self._encrypted_title:
-            return decrypt_data(self._encrypted_title)
-        return self.title
+        return self._decrypt_field('title')
     
     @property
     def decrypted_description(self):
         """Return decrypted description"""
-        if self._encrypted_description:
-            return decrypt_data(self._encrypted_description)
-        return self.description
+        return self._decrypt_field('description')
+    
+    @classmethod
+    def prepare_batch(cls, instances, workers=None):
+        """Fill the encrypted and fingerprint columns before a write"""
+        instances = cls.encrypt_batch(instances, workers=workers)
+        for instance in instances:
+            instance.fingerprint = transaction_fingerprint(instance.date, instance.amount, instance.title)
+        return instances
+    
+    @classmethod
+    def encrypt_batch(cls, instances, workers=None):
+        """
+        Encrypt title and description for many instances in one batched pass.
+
+        Used by save() and by the bulk write paths, which bypass save().
+        The plaintext is kept on the instance so serializing it afterwards
+        does not decrypt again.
+        """
+        instances = list(instances)
+        titles = seal_many([instance.title for instance in instances], 'title', workers=workers)
+        descriptions = seal_many([instance.description for instance in instances], 'description', workers=workers)
+        for instance, title, description in zip(instances, titles, descriptions):
+            instance._sealed_title = title
+            instance._sealed_description = description
+            instance._encrypted_title = instance._encrypted_description = None
+            instance._plaintext = {'title': instance.title, 'description': instance.description}
+        return instances
+    
+    @classmethod
+    def decrypt_batch(cls, instances, workers=None):
+        """
+        Decrypt title and description for many instances in one batched pass.
+
+        Results are cached on each instance so the decrypted_* properties do
+        not decrypt again. Rows in either storage format can be mixed; values
+        no configured key can decrypt fall back to the plaintext columns.
+        """
+        instances = list(instances)
+        plaintext = [{} for _ in instances]
+        for field in ('title', 'description'):
+            legacy = [i for i, instance in enumerate(instances) if getattr(instance, f'_encrypted_{field}')]
+            sealed = [
+                i for i, instance in enumerate(instances)
+                if not getattr(instance, f'_encrypted_{field}') and getattr(instance, f'_sealed_{field}')
+            ]
+            opened = open_many([getattr(instances[i], f'_sealed_{field}') for i in sealed], field, workers=workers)
+            decrypted = decrypt_many([getattr(instances[i], f'_encrypted_{field}') for i in legacy], workers=workers)
+            for i, value in zip(sealed + legacy, opened + decrypted):
+                if value is not None:
+                    plaintext[i][field] = value
+        for instance, values in zip(instances, plaintext):
+            instance._plaintext = {
+                'title': values.get('title', instance.title),
+                'description': values.get('description', instance.description),
+            }
+        return instances
     
     def __str__(self):
         return f"{self.user.username} - {self.title} - ${self.amount}" 
 
 
 
+class LedgerSummary(models.Model):
+    """
+    Per-user, per-month, per-type running totals of Transaction rows.
+
+    Maintained incrementally by Transaction writes (see ledger.py) so stats
+    reads are proportional to the number of buckets, not transactions.
+    Expenses are stored as a positive total.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ledger_summaries')
+    month = models.DateField(help_text="First day of the month")
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    count = models.IntegerField(default=0)
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expenses = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['user', 'month', 'transaction_type']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'transaction_type'], name='unique_ledger_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.month:%Y-%m} - {self.transaction_type}"
+
+
+class DailyBalance(models.Model):
+    """
+    Per-user, per-day net amount and running balance.
+
+    ``balance`` is the prefix sum of every transaction up to and including
+    ``date``, so the balance at any date is the row on or before it (one
+    index lookup) and a balance series is a range scan. Maintained
+    incrementally by Transaction writes (see ledger.py); days without
+    transactions have no row.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_balances')
+    date = models.DateField()
+    count = models.IntegerField(default=0)
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['user', 'date']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_daily_balance'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.balance}"
+
+
+class TransactionSearchToken(models.Model):
+    """Keyed hash of a word prefix from a transaction's title or description"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=32)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'token'], name='search_user_token_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_id} - {self.token}"
+
+
+class TransactionTombstone(models.Model):
+    """Records a deleted transaction so offline clients can drop it on sync"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='transaction_tombstones')
+    transaction_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.transaction_id} deleted {self.deleted_at}"
+
+
+class SyncOperation(models.Model):
+    """Result of an offline change applied through the sync endpoint, keyed for replay"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_operations')
+    idempotency_key = models.CharField(max_length=64)
+    transaction_id = models.BigIntegerField(null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_sync_operation'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.idempotency_key}"
+
+
+class ImportJob(models.Model):
+    """A bank statement upload processed in the background"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('ofx', 'OFX'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_rows = models.IntegerField(default=0)
+    imported = models.IntegerField(default=0)
+    duplicates = models.IntegerField(default=0)
+    failed_rows = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.file_format} import {self.status}"
+
+
+class KeyRotationCheckpoint(models.Model):
+    """Progress of rotate_encryption_key towards one ENCRYPTION_KEY, so it can resume"""
+    key_id = models.CharField(max_length=16, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    rotated = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.key_id} at {self.last_id}"
+
+
 class BankAccount(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bank_accounts', null=True, blank=True)
     name = models.CharField(max_length=100)
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Keyset pagination over the ('-date', '-created_at', '-id') ordering.
+
+    Each page is fetched with a range predicate on the last row of the
+    previous page, so deep pages cost the same as the first one. Pagination
+    is opt-in: clients that send neither ``cursor`` nor ``page_size`` keep
+    receiving the plain list.
+    """
+    ordering = ('-date', '-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, instance):
+        position = [instance.date.isoformat(), instance.created_at.isoformat(), instance.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date, created_at, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = (parse_date(date), parse_datetime(created_at), int(pk))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def page_queryset(self, queryset, request):
+        """
+        Return the lazy queryset for the requested page (one extra row to
+        detect a next page), or None when the request is not paginated.
+        """
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            date, created_at, pk = position
+            queryset = queryset.filter(
+                Q(date__lt=date)
+                | Q(date=date, created_at__lt=created_at)
+                | Q(date=date, created_at=created_at, id__lt=pk)
+            )
+        return queryset[:self.page_size_value + 1]
+
+    def set_page(self, rows):
+        """Trim the rows fetched from page_queryset to the page"""
+        self.has_next = len(rows) > self.page_size_value
+        self.page = rows[:self.page_size_value]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size_value)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,120 @@
+"""
+Blind-index search over encrypted transaction titles and descriptions.
+
+Words from the plaintext are normalized and every prefix (2 to
+MAX_PREFIX_LENGTH characters) is stored as a keyed HMAC in
+TransactionSearchToken. A search term is hashed the same way and matched
+with an indexed equality lookup, so searching never decrypts rows and the
+side table never holds readable text.
+"""
+import functools
+import hashlib
+import hmac
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Count
+
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 16
+MAX_QUERY_TERMS = 8
+
+_WORD = re.compile(r'\w+')
+
+
+@functools.lru_cache(maxsize=8)
+def _index_key(secret):
+    return hashlib.sha256(b'transactions.search|' + secret.encode()).digest()
+
+
+def get_index_key():
+    """Key new tokens are written with: SEARCH_INDEX_KEY, or else ENCRYPTION_KEY"""
+    return _index_key(getattr(settings, 'SEARCH_INDEX_KEY', None) or settings.ENCRYPTION_KEY)
+
+
+def get_query_keys():
+    """
+    Keys a search matches tokens under. Without SEARCH_INDEX_KEY the index
+    follows the encryption keys, so rows not yet reindexed by
+    rotate_encryption_key still match under ENCRYPTION_OLD_KEYS.
+    """
+    if getattr(settings, 'SEARCH_INDEX_KEY', None):
+        return [get_index_key()]
+    from .utils import encryption_keys
+    return [_index_key(key) for key in dict.fromkeys(encryption_keys())]
+
+
+def normalize_words(text):
+    """Lowercase, strip accents and split text into words"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return _WORD.findall(text)
+
+
+def blind_token(value, key=None):
+    return hmac.new(key or get_index_key(), value.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def tokens_for_text(*texts):
+    """Return the set of blind tokens that index the given texts"""
+    key = get_index_key()
+    prefixes = set()
+    for text in texts:
+        for word in normalize_words(text):
+            for length in range(MIN_PREFIX_LENGTH, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                prefixes.add(word[:length])
+    return {blind_token(prefix, key) for prefix in prefixes}
+
+
+def tokens_for_query(query):
+    """
+    Return the blind tokens a search must match: one set per query term,
+    holding the term's token under each of get_query_keys()
+    """
+    keys = get_query_keys()
+    terms = [w for w in normalize_words(query) if len(w) >= MIN_PREFIX_LENGTH][:MAX_QUERY_TERMS]
+    terms = dict.fromkeys(term[:MAX_PREFIX_LENGTH] for term in terms)
+    return [{blind_token(term, key) for key in keys} for term in terms]
+
+
+def build_search_tokens(instances):
+    """Return unsaved TransactionSearchToken rows for saved Transaction instances"""
+    from .models import TransactionSearchToken
+
+    rows = []
+    for instance in instances:
+        for token in tokens_for_text(instance.title, instance.description):
+            rows.append(TransactionSearchToken(user_id=instance.user_id, transaction_id=instance.pk, token=token))
+    return rows
+
+
+def reindex_transactions(instances):
+    """Replace the search tokens of the given (saved) transactions"""
+    from .models import TransactionSearchToken
+
+    instances = [instance for instance in instances if instance.pk is not None]
+    if not instances:
+        return
+    TransactionSearchToken.objects.filter(transaction_id__in=[i.pk for i in instances]).delete()
+    TransactionSearchToken.objects.bulk_create(build_search_tokens(instances), batch_size=1000)
+
+
+def search_transactions(queryset, user, query):
+    """
+    Restrict a Transaction queryset to rows whose title or description has
+    a word starting with every term of ``query``. A query without a term of
+    at least MIN_PREFIX_LENGTH characters matches nothing.
+    """
+    from .models import TransactionSearchToken
+
+    terms = tokens_for_query(query)
+    if not terms:
+        return queryset.none()
+    # A row is indexed under a single key, so it matches one token per term
+    matches = TransactionSearchToken.objects.filter(user=user, token__in=set().union(*terms))
+    if len(terms) > 1:
+        matches = matches.values('transaction_id').annotate(
+            matched=Count('token', distinct=True),
+        ).filter(matched=len(terms))
+    return queryset.filter(pk__in=matches.values('transaction_id'))
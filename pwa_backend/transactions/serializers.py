@@ -1,6 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Transaction
+from django.db import IntegrityError, models, transaction as db_transaction
+from accounts.models import UsernameSequence
+from pwa_backend.instrumentation import measure
+from .models import ImportJob, Transaction
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,8 +13,53 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class TransactionUserField(serializers.Field):
+    """
+    Nested owner of a transaction, serialized once per user and reused for
+    every row. The authenticated user is used when it owns the row, so rows
+    never load their user from the database.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance
+
+    def to_representation(self, instance):
+        serialized = self.context.setdefault('_serialized_users', {})
+        if instance.user_id not in serialized:
+            request = self.context.get('request')
+            user = getattr(request, 'user', None)
+            if user is None or user.pk != instance.user_id:
+                user = instance.user
+            serialized[instance.user_id] = UserSerializer(user).data
+        return serialized[instance.user_id]
+
+
+class TransactionListSerializer(serializers.ListSerializer):
+    """Decrypts every row of a page in one batch before serializing"""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        if self.child.ENCRYPTED_FIELDS & set(self.child.fields):
+            iterable = Transaction.decrypt_batch(iterable)
+        with measure('serialize'):
+            return super().to_representation(iterable)
+
+
 class TransactionSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)
+    """
+    Transaction serializer with decrypted title/description.
+
+    On GET requests a ``fields`` query parameter (comma separated) limits
+    the output to the listed fields, e.g. ``?fields=id,title,amount,date``
+    drops the nested user and the duplicated decrypted_* values.
+    """
+    ENCRYPTED_FIELDS = {'title', 'description', 'decrypted_title', 'decrypted_description'}
+
+    user = TransactionUserField()
     decrypted_title = serializers.CharField(read_only=True)
     decrypted_description = serializers.CharField(read_only=True)
     
@@ -23,15 +71,50 @@ class TransactionSerializer(serializers.ModelSerializer):
             'decrypted_title', 'decrypted_description'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        list_serializer_class = TransactionListSerializer
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        requested = request.query_params.get('fields')
+        if requested:
+            wanted = {name.strip() for name in requested.split(',') if name.strip()}
+            for name in set(fields) - wanted:
+                fields.pop(name)
+        return fields
     
+    @property
+    def data(self):
+        # Single instances; lists are measured in TransactionListSerializer
+        with measure('serialize'):
+            return super().data
+
     def to_representation(self, instance):
         """Override to use decrypted data in API responses"""
         data = super().to_representation(instance)
-        data['title'] = instance.decrypted_title
-        data['description'] = instance.decrypted_description
+        if 'title' in data:
+            data['title'] = instance.decrypted_title
+        if 'description' in data:
+            data['description'] = instance.decrypted_description
         return data
 
 
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'file_format', 'status', 'total_rows', 'imported', 'duplicates',
+            'failed_rows', 'errors', 'created_at', 'finished_at',
+        ]
+        read_only_fields = fields
+
+
+# Usernames allocated before giving up on collisions with non-sequence names
+USERNAME_ATTEMPTS = 5
+
+
 class RegisterUserSerializer(serializers.Serializer):
     """Serializer for user registration with bank account details"""
     name = serializers.CharField(required=True, max_length=100, help_text="Full name of the user")
@@ -73,23 +156,24 @@ class RegisterUserSerializer(serializers.Serializer):
         account_number = validated_data.pop('account_number')
         ifsc_code = validated_data.pop('ifsc_code')
         
-        # Generate username from email (take part before @)
+        # Generate username from email (take part before @); the sequence
+        # hands out base, base_1, base_2, ... in constant queries
         username_base = email.split('@')[0]
-        username = username_base
-        counter = 1
-        
-        # Ensure username is unique
-        while User.objects.filter(username=username).exists():
-            username = f"{username_base}_{counter}"
-            counter += 1
-        
-        # Create user
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password,
-            first_name=name
-        )
+        for attempt in range(USERNAME_ATTEMPTS):
+            username = UsernameSequence.objects.allocate(username_base)
+            try:
+                with db_transaction.atomic():
+                    user = User.objects.create_user(
+                        username=username,
+                        email=email,
+                        password=password,
+                        first_name=name
+                    )
+                break
+            except IntegrityError:
+                # Taken outside the sequence (e.g. chosen on /api/accounts/register/)
+                if attempt == USERNAME_ATTEMPTS - 1:
+                    raise
         
         # Create bank account linked to user
         from .models import BankAccount
@@ -0,0 +1,11 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_ledgers
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """Profile data is cached per user, so drop it when the user row changes"""
+    invalidate_ledgers({instance.pk}, using=kwargs.get('using'))
@@ -0,0 +1,151 @@
+import calendar
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from rest_framework.exceptions import ValidationError
+
+GROUP_BY_CHOICES = ('month', 'type')
+
+
+def _empty_bucket():
+    return {'count': 0, 'income': Decimal('0'), 'expenses': Decimal('0')}
+
+
+def _add_row(bucket, row):
+    bucket['count'] += row['count']
+    bucket['income'] += row['income'] or 0
+    bucket['expenses'] += abs(row['expenses'] or 0)
+
+
+def _format_bucket(bucket):
+    return {
+        'count': bucket['count'],
+        'income': float(bucket['income']),
+        'expenses': float(bucket['expenses']),
+        'net': float(bucket['income'] - bucket['expenses']),
+    }
+
+
+def build_stats(rows, group_by=None):
+    """
+    Build the stats payload from grouped rows.
+
+    Each row is a dict with ``transaction_type``, ``count``, ``income`` and
+    ``expenses`` (negative sum), plus ``month`` when grouping by month.
+    """
+    totals = _empty_bucket()
+    type_counts = {}
+    months = {}
+    types = {}
+
+    for row in rows:
+        _add_row(totals, row)
+        transaction_type = row['transaction_type']
+        type_counts[transaction_type] = type_counts.get(transaction_type, 0) + row['count']
+        if group_by == 'type':
+            _add_row(types.setdefault(transaction_type, _empty_bucket()), row)
+        elif group_by == 'month':
+            month = months.setdefault(row['month'], {'bucket': _empty_bucket(), 'types': {}})
+            _add_row(month['bucket'], row)
+            month['types'][transaction_type] = month['types'].get(transaction_type, 0) + row['count']
+
+    stats = {
+        'total_transactions': totals['count'],
+        'total_income': float(totals['income']),
+        'total_expenses': float(totals['expenses']),
+        'net_amount': float(totals['income'] - totals['expenses']),
+        'transaction_types': {t: c for t, c in type_counts.items() if c > 0},
+    }
+
+    if group_by == 'type':
+        stats['buckets'] = [
+            {'transaction_type': transaction_type, **_format_bucket(bucket)}
+            for transaction_type, bucket in sorted(types.items())
+        ]
+    elif group_by == 'month':
+        stats['buckets'] = [
+            {'period': month.strftime('%Y-%m'), **_format_bucket(entry['bucket']), 'transaction_types': entry['types']}
+            for month, entry in sorted(months.items())
+        ]
+
+    return stats
+
+
+def validate_group_by(group_by):
+    if group_by not in (None, *GROUP_BY_CHOICES):
+        raise ValidationError({'group_by': f'Expected one of: {", ".join(GROUP_BY_CHOICES)}.'})
+    return group_by
+
+
+def grouped_rows(queryset, group_by=None):
+    """Return the lazy grouped values() queryset that build_stats consumes"""
+    keys = ['transaction_type']
+    queryset = queryset.order_by()
+    if group_by == 'month':
+        queryset = queryset.annotate(month=TruncMonth('date'))
+        keys.append('month')
+
+    return queryset.values(*keys).annotate(
+        count=Count('id'),
+        income=Sum('amount', filter=Q(amount__gt=0)),
+        expenses=Sum('amount', filter=Q(amount__lt=0)),
+    )
+
+
+def aggregate_stats(queryset, group_by=None):
+    """Compute stats for a Transaction queryset with a single grouped query"""
+    validate_group_by(group_by)
+    return build_stats(grouped_rows(queryset, group_by), group_by=group_by)
+
+
+def _month_aligned(date_from, date_to):
+    if date_from and date_from.day != 1:
+        return False
+    if date_to and date_to.day != calendar.monthrange(date_to.year, date_to.month)[1]:
+        return False
+    return True
+
+
+def ledger_summary_queryset(user, params):
+    """
+    Return the LedgerSummary queryset that answers a stats request.
+
+    Returns None when the request cannot be answered from monthly buckets
+    (a date range that does not start and end on month boundaries).
+    """
+    from .filters import parse_date_param
+    from .models import LedgerSummary, Transaction
+
+    date_from = parse_date_param(params, 'date_from')
+    date_to = parse_date_param(params, 'date_to')
+    if not _month_aligned(date_from, date_to):
+        return None
+
+    summaries = LedgerSummary.objects.filter(user=user)
+    if date_from:
+        summaries = summaries.filter(month__gte=date_from)
+    if date_to:
+        summaries = summaries.filter(month__lte=date_to)
+    transaction_type = params.get('transaction_type')
+    if transaction_type:
+        if transaction_type not in dict(Transaction.TRANSACTION_TYPES):
+            raise ValidationError({'transaction_type': f'Unknown transaction type "{transaction_type}".'})
+        summaries = summaries.filter(transaction_type=transaction_type)
+    return summaries
+
+
+def ledger_stats(user, params, group_by=None):
+    """
+    Serve stats from the LedgerSummary table.
+
+    Returns None when the date range splits a month, in which case the
+    caller should fall back to aggregate_stats.
+    """
+    from .ledger import summary_rows
+
+    validate_group_by(group_by)
+    summaries = ledger_summary_queryset(user, params)
+    if summaries is None:
+        return None
+    return build_stats(summary_rows(summaries), group_by=group_by)
@@ -0,0 +1,157 @@
+"""
+Delta sync for offline-capable clients.
+
+A client keeps the ``token`` returned by the last sync and sends it back as
+``since``. The response carries only the rows updated since then and the ids
+of rows deleted since then (from TransactionTombstone). Offline writes are
+pushed in the same request; each carries an ``idempotency_key`` so a retried
+upload is answered from the stored SyncOperation instead of being applied
+twice.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from .models import SyncOperation, Transaction, TransactionTombstone
+from .serializers import TransactionSerializer
+
+SYNC_OPERATIONS = ('create', 'update', 'delete')
+
+
+def get_overlap():
+    # Rows saved just before the token time may commit just after it; the
+    # token is moved back by this margin so the next sync still sees them.
+    return timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 5))
+
+
+def get_retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def issue_token(moment):
+    return (moment - get_overlap()).isoformat()
+
+
+def parse_token(value):
+    if not value:
+        return None
+    since = parse_datetime(value) if isinstance(value, str) else None
+    if since is None:
+        raise ValidationError({'since': 'Invalid sync token.'})
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, timezone.utc)
+    return since
+
+
+def _validate_change(change):
+    if not isinstance(change, dict):
+        return 'Each change must be an object.'
+    key = change.get('idempotency_key')
+    if not isinstance(key, str) or not key or len(key) > 64:
+        return 'idempotency_key is required (max 64 characters).'
+    if change.get('op') not in SYNC_OPERATIONS:
+        return f'op must be one of: {", ".join(SYNC_OPERATIONS)}.'
+    if change['op'] != 'create' and not isinstance(change.get('id'), int):
+        return 'id is required for update and delete.'
+    return None
+
+
+def _apply_change(user, change, context):
+    op = change['op']
+    if op == 'create':
+        serializer = TransactionSerializer(data=change.get('data') or {}, context=context)
+        if not serializer.is_valid():
+            return status.HTTP_400_BAD_REQUEST, None, {'errors': serializer.errors}
+        instance = serializer.save(user=user)
+        return status.HTTP_201_CREATED, instance.pk, {}
+
+    instance = Transaction.objects.filter(user=user, pk=change['id']).first()
+    if instance is None:
+        return status.HTTP_404_NOT_FOUND, change['id'], {'errors': 'Transaction not found.'}
+    if op == 'delete':
+        instance.delete()
+        return status.HTTP_204_NO_CONTENT, change['id'], {}
+
+    serializer = TransactionSerializer(instance, data=change.get('data') or {}, partial=True, context=context)
+    if not serializer.is_valid():
+        return status.HTTP_400_BAD_REQUEST, instance.pk, {'errors': serializer.errors}
+    serializer.save()
+    return status.HTTP_200_OK, instance.pk, {}
+
+
+def apply_changes(user, changes, context):
+    """Apply queued offline changes, replaying any already-seen idempotency keys"""
+    if not isinstance(changes, list):
+        raise ValidationError({'changes': 'Expected a list.'})
+    max_changes = getattr(settings, 'SYNC_MAX_CHANGES', 500)
+    if len(changes) > max_changes:
+        raise ValidationError({'changes': f'At most {max_changes} changes per request.'})
+
+    keys = [c.get('idempotency_key') for c in changes if isinstance(c, dict)]
+    seen = {
+        op.idempotency_key: op
+        for op in SyncOperation.objects.filter(user=user, idempotency_key__in=[k for k in keys if isinstance(k, str)])
+    }
+
+    results = []
+    for change in changes:
+        error = _validate_change(change)
+        if error:
+            results.append({'idempotency_key': change.get('idempotency_key') if isinstance(change, dict) else None,
+                            'status': status.HTTP_400_BAD_REQUEST, 'errors': error})
+            continue
+
+        key = change['idempotency_key']
+        if key in seen:
+            results.append(seen[key].response)
+            continue
+
+        try:
+            with db_transaction.atomic():
+                status_code, transaction_id, extra = _apply_change(user, change, context)
+                response = {'idempotency_key': key, 'status': status_code, 'id': transaction_id, **extra}
+                seen[key] = SyncOperation.objects.create(
+                    user=user, idempotency_key=key, transaction_id=transaction_id,
+                    status_code=status_code, response=response,
+                )
+        except IntegrityError:
+            # A concurrent request with the same key won; replay its result
+            seen[key] = SyncOperation.objects.get(user=user, idempotency_key=key)
+            response = seen[key].response
+        results.append(response)
+    return results
+
+
+def collect_changes(user, since, context):
+    """Return the sync payload for everything changed after ``since``"""
+    now = timezone.now()
+    full_resync = since is None or since < now - get_retention()
+
+    changed = Transaction.objects.filter(user=user).order_by('updated_at', 'id')
+    deleted = []
+    if not full_resync:
+        changed = changed.filter(updated_at__gte=since)
+        deleted = list(
+            TransactionTombstone.objects.filter(user=user, deleted_at__gte=since)
+            .order_by('deleted_at').values_list('transaction_id', flat=True)
+        )
+
+    return {
+        'token': issue_token(now),
+        'full_resync': full_resync,
+        'changed': TransactionSerializer(changed, many=True, context=context).data,
+        'deleted': deleted,
+    }
+
+
+def prune_sync_state(now=None):
+    """Delete tombstones and idempotency records older than the retention window"""
+    cutoff = (now or timezone.now()) - get_retention()
+    tombstones, _ = TransactionTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    operations, _ = SyncOperation.objects.filter(created_at__lt=cutoff).delete()
+    return tombstones, operations
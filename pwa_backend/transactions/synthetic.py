@@ -0,0 +1,78 @@
+"""
+Synthetic users and ledgers for load tests and benchmarks.
+
+Rows go through ``Transaction.objects.bulk_create`` in batches, so they are
+encrypted, fingerprinted, search-indexed and counted in LedgerSummary
+exactly like imported data.
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from .models import Transaction
+
+# (transaction_type, titles, amount range); income is positive, spending negative
+CATALOG = (
+    ('salary', ('Monthly Salary', 'Freelance Project', 'Bonus Payment', 'Consulting Invoice'), (800, 6000)),
+    ('grocery', ('Grocery Shopping', 'Farmers Market', 'Supermarket Run', 'Bakery'), (-250, -5)),
+    ('fees', ('Internet Bill', 'Phone Bill', 'Bank Fee', 'Electricity Bill', 'Insurance Premium'), (-300, -2)),
+    ('entertainment', ('Movie Tickets', 'Concert', 'Streaming Subscription', 'Restaurant Dinner'), (-150, -8)),
+    ('transport', ('Gas Station', 'Train Ticket', 'Taxi Ride', 'Parking'), (-120, -3)),
+    ('other', ('Online Order', 'Pharmacy', 'Gift', 'Home Repair', 'Refund'), (-400, 150)),
+)
+
+DESCRIPTIONS = (
+    '', 'Paid by card', 'Recurring payment', 'Split with friends', 'Weekly expense',
+    'Reimbursable', 'Annual renewal', 'Cash withdrawal',
+)
+
+
+def create_users(count, prefix='synthetic', password='synthetic-password'):
+    """Bulk-create ``count`` users sharing one password hash (hashing is the slow part)"""
+    hashed = make_password(password)
+    users = [
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', first_name=f'{prefix.title()} {i}',
+             password=hashed)
+        for i in range(count)
+    ]
+    User.objects.bulk_create(users, batch_size=1000)
+    return list(User.objects.filter(username__in=[user.username for user in users]).order_by('pk'))
+
+
+def iter_transactions(user, count, rng, days=730, today=None):
+    """Yield ``count`` unsaved, plausible transactions for ``user``"""
+    today = today or date.today()
+    for _ in range(count):
+        transaction_type, titles, (low, high) = rng.choice(CATALOG)
+        yield Transaction(
+            user=user,
+            title=rng.choice(titles),
+            description=rng.choice(DESCRIPTIONS),
+            amount=Decimal(rng.randint(low * 100, high * 100)) / 100,
+            transaction_type=transaction_type,
+            date=today - timedelta(days=rng.randrange(days)),
+        )
+
+
+def create_transactions(users, per_user, seed=0, batch_size=1000, days=730, progress=None):
+    """
+    Insert ``per_user`` transactions for each user in batches.
+
+    ``progress`` is called with the running total after every batch.
+    """
+    rng = random.Random(seed)
+    total = 0
+    for user in users:
+        remaining = per_user
+        rows = iter_transactions(user, per_user, rng, days=days)
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            Transaction.objects.bulk_create([next(rows) for _ in range(size)])
+            remaining -= size
+            total += size
+            if progress:
+                progress(total)
+    return total
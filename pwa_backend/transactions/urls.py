@@ -5,6 +5,10 @@ urlpatterns = [
     # Transaction endpoints
     path('transactions/', views.TransactionListCreateView.as_view(), name='transaction-list-create'),
     path('transactions/<int:pk>/', views.TransactionDetailView.as_view(), name='transaction-detail'),
+    path('transactions/bulk/', views.TransactionBulkView.as_view(), name='transaction-bulk'),
+    path('transactions/export/', views.TransactionExportView.as_view(), name='transaction-export'),
+    path('transactions/import/', views.TransactionImportView.as_view(), name='transaction-import'),
+    path('transactions/import/<uuid:job_id>/', views.import_status, name='transaction-import-status'),
     
     # User endpoints
     path('user/profile/', views.user_profile, name='user-profile'),
@@ -12,4 +16,6 @@ urlpatterns = [
     # Data generation
     path('transactions/generate-sample/', views.generate_sample_data, name='generate-sample-data'),
     path('transactions/stats/', views.transaction_stats, name='transaction-stats'),
+    path('transactions/balance-series/', views.balance_series, name='transaction-balance-series'),
+    path('transactions/sync/', views.sync_transactions, name='transaction-sync'),
 ] 
\ No newline at end of file
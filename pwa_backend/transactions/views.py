@@ -2,12 +2,28 @@ from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.shortcuts import get_object_or_404
-from .models import Transaction
-from .serializers import TransactionSerializer, RegisterUserSerializer, UserSerializer
+from accounts.authentication import issue_access_token
+from .models import ImportJob, Transaction
+from .serializers import ImportJobSerializer, TransactionSerializer, RegisterUserSerializer, UserSerializer
 from .utils import generate_sample_transactions
+from .balances import balance_series_payload, request_series_range
+from .cache import cache_per_user
+from .conditional import balance_series_validator, conditional_response, ledger_validator, profile_validator, transaction_validator
+from .export import EXPORT_FORMATS, ExportContentNegotiation, stream_export
+from .filters import filter_transactions
+from .imports import detect_format, start_import
+from .pagination import TransactionCursorPagination
+from .search import search_transactions
+from .stats import aggregate_stats, ledger_stats
+from .sync import apply_changes, collect_changes, parse_token
 
 
 @api_view(['POST'])
@@ -19,8 +35,7 @@ def register_user(request):
     if serializer.is_valid():
         user = serializer.save()
         # Generate JWT token for the newly registered user
-        refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
+        access_token = issue_access_token(user)
         
         # Generate sample transactions for the new user
         sample_transactions = generate_sample_transactions(user)
@@ -54,12 +69,31 @@ def register_user(request):
 
 
 class TransactionListCreateView(generics.ListCreateAPIView):
-    """List and create transactions for the authenticated user"""
+    """
+    List and create transactions for the authenticated user
+
+    GET accepts the shared filters (``date_from``, ``date_to``,
+    ``transaction_type``), ``q`` for a blind-index word-prefix search over
+    title and description, cursor pagination via ``page_size``/``cursor``
+    and a ``fields`` sparse fieldset.
+    """
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionCursorPagination
     
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user)
+        queryset = Transaction.objects.filter(user=self.request.user)
+        if self.request.method == 'GET':
+            queryset = filter_transactions(queryset, self.request.query_params)
+            query = self.request.query_params.get('q')
+            if query:
+                queryset = search_transactions(queryset, self.request.user, query)
+        return queryset
+    
+    @cache_per_user
+    @conditional_response(ledger_validator)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -72,10 +106,186 @@ class TransactionDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
+    
+    @conditional_response(transaction_validator)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class TransactionBulkView(APIView):
+    """
+    Bulk create, update and delete transactions
+
+    POST   ``[{...}, ...]``                 create every item with one bulk_create
+    PATCH  ``[{"id": 1, ...}, ...]``        partially update items with one bulk_update
+    DELETE ``{"ids": [1, 2, ...]}``         delete the listed transactions
+
+    Writes happen in a single database transaction. If any item is invalid
+    nothing is written and ``errors`` lists each failing item by index.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get_items(self, data):
+        max_items = settings.TRANSACTION_BULK_MAX_ITEMS
+        if not isinstance(data, list) or not data:
+            raise ValidationError({'error': 'Expected a non-empty list of transactions.'})
+        if len(data) > max_items:
+            raise ValidationError({'error': f'At most {max_items} transactions per request.'})
+        return data
+    
+    def post(self, request):
+        items = self.get_items(request.data)
+        serializer = TransactionSerializer(data=items, many=True, context={'request': request})
+        if not serializer.is_valid():
+            errors = [{'index': i, 'errors': e} for i, e in enumerate(serializer.errors) if e]
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        transactions = [Transaction(user=request.user, **data) for data in serializer.validated_data]
+        with db_transaction.atomic():
+            created = Transaction.objects.bulk_create(transactions, batch_size=500)
+        
+        return Response({
+            'created': len(created),
+            'ids': [t.pk for t in created],
+        }, status=status.HTTP_201_CREATED)
+    
+    def patch(self, request):
+        items = self.get_items(request.data)
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        instances = Transaction.objects.filter(user=request.user).in_bulk(
+            [pk for pk in ids if isinstance(pk, int)]
+        )
+        
+        errors = []
+        updates = []
+        for index, item in enumerate(items):
+            instance = instances.get(item.get('id')) if isinstance(item, dict) else None
+            if instance is None:
+                errors.append({'index': index, 'errors': {'id': ['Transaction not found.']}})
+                continue
+            serializer = TransactionSerializer(instance, data=item, partial=True, context={'request': request})
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            updates.append((instance, serializer.validated_data))
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        fields = set()
+        for instance, data in updates:
+            for field, value in data.items():
+                setattr(instance, field, value)
+            fields.update(data)
+        with db_transaction.atomic():
+            if fields:
+                Transaction.objects.bulk_update([instance for instance, _ in updates], sorted(fields), batch_size=500)
+        
+        return Response({'updated': len(updates)})
+    
+    def delete(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'ids': 'Expected a list of transaction ids.'})
+        if len(ids) > settings.TRANSACTION_BULK_MAX_ITEMS:
+            raise ValidationError({'ids': f'At most {settings.TRANSACTION_BULK_MAX_ITEMS} ids per request.'})
+        
+        with db_transaction.atomic():
+            queryset = Transaction.objects.filter(user=request.user, pk__in=ids)
+            found = set(queryset.values_list('pk', flat=True))
+            queryset.delete()
+        
+        return Response({
+            'deleted': len(found),
+            'not_found': [pk for pk in ids if pk not in found],
+        })
+
+
+class TransactionExportView(APIView):
+    """
+    Stream the user's transactions as CSV or JSON lines
+
+    ``?format=csv|jsonl`` (default ``csv``) plus the list filters
+    ``date_from``, ``date_to`` and ``transaction_type``.
+    """
+    permission_classes = [IsAuthenticated]
+    content_negotiation_class = ExportContentNegotiation
+    
+    def get(self, request):
+        export_format = request.query_params.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'format': f'Expected one of: {", ".join(EXPORT_FORMATS)}.'})
+        
+        queryset = filter_transactions(Transaction.objects.filter(user=request.user), request.query_params)
+        queryset = queryset.order_by('-date', '-created_at', '-id')
+        chunk_size = settings.TRANSACTION_EXPORT_CHUNK_SIZE
+        
+        response = StreamingHttpResponse(
+            stream_export(queryset, export_format, chunk_size),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        filename = f"transactions-{timezone.now():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TransactionImportView(APIView):
+    """
+    Upload a bank statement (multipart ``file``, CSV or OFX) for background import
+
+    Returns 202 with the ImportJob; poll ``/api/transactions/import/<id>/``
+    for progress. ``file_format`` overrides detection by file extension.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        uploaded = request.FILES.get('file')
+        if uploaded is None:
+            raise ValidationError({'file': 'Upload a CSV or OFX statement.'})
+        file_format = detect_format(uploaded, request.data.get('file_format'))
+        if file_format not in dict(ImportJob.FORMAT_CHOICES):
+            raise ValidationError({'file_format': 'Expected csv or ofx.'})
+        
+        job = start_import(request.user, uploaded, file_format)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def import_status(request, job_id):
+    """Get the progress of a statement import"""
+    job = get_object_or_404(ImportJob, pk=job_id, user=request.user)
+    return Response(ImportJobSerializer(job).data)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def sync_transactions(request):
+    """
+    Delta sync for offline clients
+
+    GET ``?since=<token>`` returns rows changed and ids deleted since the
+    token. POST ``{"since": token, "changes": [...]}`` first applies queued
+    offline creates/updates/deletes (each with an ``idempotency_key``), then
+    returns the same delta plus a per-change ``results`` list.
+    """
+    context = {'request': request}
+    if request.method == 'GET':
+        since = parse_token(request.query_params.get('since'))
+        return Response(collect_changes(request.user, since, context))
+
+    if not isinstance(request.data, dict):
+        raise ValidationError('Expected an object with "since" and "changes".')
+    since = parse_token(request.data.get('since'))
+    results = apply_changes(request.user, request.data.get('changes', []), context)
+    payload = collect_changes(request.user, since, context)
+    payload['results'] = results
+    return Response(payload)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_user
+@conditional_response(profile_validator)
 def user_profile(request):
     """Get current user profile"""
     serializer = UserSerializer(request.user)
@@ -105,27 +315,36 @@ def generate_sample_data(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cache_per_user(vary=request_series_range)
+@conditional_response(balance_series_validator)
+def balance_series(request):
+    """
+    Get the user's balance over time
+
+    Query parameters: ``from``/``to`` (YYYY-MM-DD, default: first
+    transaction and today) and ``interval`` (``day``, ``week`` or
+    ``month``). Each point is the closing balance of a period and its net
+    change, served from the DailyBalance prefix sums.
+    """
+    return Response(balance_series_payload(request.user, *request_series_range(request)))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_per_user
+@conditional_response(ledger_validator)
 def transaction_stats(request):
-    """Get transaction statistics for the user"""
-    user = request.user
-    transactions = Transaction.objects.filter(user=user)
-    
-    total_income = sum(t.amount for t in transactions if t.amount > 0)
-    total_expenses = sum(abs(t.amount) for t in transactions if t.amount < 0)
-    net_amount = total_income - total_expenses
-    
-    stats = {
-        'total_transactions': transactions.count(),
-        'total_income': float(total_income),
-        'total_expenses': float(total_expenses),
-        'net_amount': float(net_amount),
-        'transaction_types': {}
-    }
-    
-    # Count by transaction type
-    for transaction_type, _ in Transaction.TRANSACTION_TYPES:
-        count = transactions.filter(transaction_type=transaction_type).count()
-        if count > 0:
-            stats['transaction_types'][transaction_type] = count
-    
-    return Response(stats) 
\ No newline at end of file
+    """
+    Get transaction statistics for the user
+
+    Optional query parameters: ``date_from``/``date_to`` (YYYY-MM-DD),
+    ``transaction_type`` and ``group_by`` (``month`` or ``type``) to add a
+    per-bucket breakdown. Served from LedgerSummary unless the date range
+    splits a month.
+    """
+    group_by = request.query_params.get('group_by') or None
+    stats = ledger_stats(request.user, request.query_params, group_by=group_by)
+    if stats is None:
+        transactions = filter_transactions(Transaction.objects.filter(user=request.user), request.query_params)
+        stats = aggregate_stats(transactions, group_by=group_by)
+    return Response(stats)